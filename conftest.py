@@ -0,0 +1,42 @@
+import pytest
+import testhelper
+import typing
+
+
+@pytest.fixture(scope="session")
+def mount_pool() -> typing.Generator[testhelper.MountPool, None, None]:
+    pool = testhelper.MountPool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="session")
+def smb_pool() -> typing.Generator[testhelper.SMBConnectionPool, None, None]:
+    pool = testhelper.SMBConnectionPool()
+    yield pool
+    pool.close()
+
+
+def pytest_terminal_summary(
+    terminalreporter: typing.Any,
+) -> None:
+    summary = testhelper.mount_stats.summary()
+    if not summary:
+        return
+    terminalreporter.section("cifs mount latency")
+    for source, ops in sorted(summary.items()):
+        for op, ent in sorted(ops.items()):
+            terminalreporter.write_line(
+                f"{source} {op}: count={ent['count']} "
+                f"failed={ent['failed']} retries={ent['retries']} "
+                f"avg={ent['avg']:.3f}s min={ent['min']:.3f}s "
+                f"max={ent['max']:.3f}s"
+            )
+            options = ent.get("options")
+            if options:
+                opts = ",".join(
+                    k if not v else f"{k}={v}"
+                    for k, v in options.items()
+                    if k not in ("password", "username")
+                )
+                terminalreporter.write_line(f"  options: {opts}")
@@ -1,3 +1,10 @@
+import json
+import os
+import pickle
+import posixpath
+import random
+import threading
+import pytest
 import testhelper
 from pathlib import Path
 
@@ -35,28 +42,722 @@ def test_read_yaml2():
 
 
 def test_get_share():
-    testinfo = testhelper.read_yaml("test-info1.yml")
-    export2 = testhelper.get_share(testinfo, "export2")
-    assert export2["server"] == "server_name"
-    assert "path" not in export2
-    assert export2["backend"]["name"] == "glusterfs"
-    assert "test2" not in export2["users"]
-    assert "user2" in export2["users"]
-    assert export2["users"]["user2"] == "user2password"
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    export2 = testhelper.get_share(testconfig, "export2")
+    assert export2.server == "server_name"
+    assert export2.path is None
+    assert export2.backend.name == "glusterfs"
+    usernames = [u.username for u in export2.users]
+    assert "test2" not in usernames
+    assert "user2" in usernames
+    assert export2.users[1] == testhelper.User("user2", "user2password")
 
 
 def test_list_premounted():
-    testinfo = testhelper.read_yaml("test-info1.yml")
-    premounted = testhelper.get_premounted_shares(testinfo)
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    premounted = testhelper.get_premounted_shares(testconfig)
     assert len(premounted) == 1
     assert Path("/mnt/share/export1-cephfs-vfs") in premounted
 
 
 def test_generate_exported_shares():
-    testinfo = testhelper.read_yaml("test-info1.yml")
+    testconfig = testhelper.load_test_config("test-info1.yml")
     arr = []
-    for sharename in testhelper.get_exported_shares(testinfo):
-        share = testhelper.get_share(testinfo, sharename)
-        arr.append((share["server"], share["name"]))
+    for sharename in testhelper.get_exported_shares(testconfig):
+        share = testhelper.get_share(testconfig, sharename)
+        arr.append((share.server, share.name))
     assert len(arr) == 1
     assert ("server_name", "export2") in arr
+
+
+def test_test_config_indexes():
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    assert testhelper.load_test_config("test-info1.yml") is testconfig
+    by_server = testconfig.shares_by_server
+    assert [s.name for s in by_server["hostname1"]] == ["export1"]
+    assert [s.name for s in by_server["server_name"]] == ["export2"]
+    by_backend = testconfig.shares_by_backend
+    assert [s.name for s in by_backend["cephfs.vfs"]] == ["export1"]
+    assert [s.name for s in by_backend["glusterfs"]] == ["export2"]
+    assert [s.name for s in testconfig.premounted_shares] == ["export1"]
+    assert [s.name for s in testconfig.exported_shares] == ["export2"]
+    assert testconfig.public_interfaces == []
+    assert testconfig.multi_mounts == [1, 2, 4, 8]
+
+    testconfig2 = testhelper.load_test_config("test-info2.yml")
+    assert testconfig2.multi_mounts == []
+    assert testconfig.benchmarks and not testconfig2.benchmarks
+    assert testconfig2.public_interfaces == [
+        "192.168.123.10",
+        "192.168.123.11",
+    ]
+    mount_params = testhelper.get_mount_parameters(testconfig2, "gluster-vol")
+    assert mount_params == testhelper.gen_mount_params(
+        "192.168.123.10", "gluster-vol", "test1", "x"
+    )
+
+
+def test_test_config_pickle():
+    testconfig = testhelper.load_test_config("test-info2.yml")
+    testconfig2 = pickle.loads(pickle.dumps(testconfig))
+    assert testconfig2.shares == testconfig.shares
+    assert testconfig2.exported_shares == testconfig.exported_shares
+
+
+def test_data_pattern_ranges():
+    pattern = testhelper.DataPattern(1234)
+    whole = pattern.read(0, 3 * 2**20 + 17)
+    assert len(whole) == 3 * 2**20 + 17
+    assert testhelper.DataPattern(1234).read(0, len(whole)) == whole
+    assert testhelper.DataPattern(1235).read(0, 4096) != whole[:4096]
+    for off, cnt in [(0, 1), (5, 4096), (4090, 20), (2**20 - 3, 8195)]:
+        assert pattern.read(off, cnt) == whole[off:][:cnt]
+    buf = bytearray(10000)
+    pattern.fill(buf, 12345)
+    assert buf == whole[12345:22345]
+    pattern2 = pickle.loads(pickle.dumps(pattern))
+    assert pattern2.read(0, len(whole)) == whole
+
+
+def test_data_pattern_chunks():
+    pattern = testhelper.DataPattern(42)
+    whole = pattern.read(100, 50000)
+    chunks = [bytes(c) for c in pattern.chunks(100, 50000, 4000)]
+    assert all(len(c) == 4000 for c in chunks[:-1])
+    assert b"".join(chunks) == whole
+
+
+def test_data_pattern_unique_blocks():
+    pattern = testhelper.DataPattern(7)
+    data = pattern.read(0, 2**22)
+    blocks = {data[i:][:4096] for i in range(0, len(data), 4096)}
+    assert len(blocks) == 2**22 // 4096
+
+
+def test_data_pattern_compare():
+    pattern = testhelper.DataPattern(99)
+    data = bytearray(pattern.read(8192, 100000))
+    assert pattern.compare(data, 8192) == -1
+    assert pattern.compare(data, 8193) >= 0
+    data[77777] ^= 0xFF
+    assert pattern.compare(data, 8192) == 77777
+
+
+def test_generate_random_bytes():
+    data = testhelper.generate_random_bytes(2**20 + 1)
+    assert isinstance(data, bytes)
+    assert len(data) == 2**20 + 1
+    assert testhelper.generate_random_bytes(0) == b""
+
+
+def test_mount_pool(monkeypatch):
+    mounted = []
+    healthy = [True]
+    monkeypatch.setattr(
+        testhelper.mounthelper,
+        "cifs_mount",
+        lambda params, mnt, opts="": mounted.append(mnt),
+    )
+    monkeypatch.setattr(
+        testhelper.mounthelper, "cifs_umount", lambda mnt: mounted.remove(mnt)
+    )
+    monkeypatch.setattr(
+        testhelper.mounthelper._PooledMount,
+        "is_healthy",
+        lambda self: healthy[0],
+    )
+    params1 = testhelper.gen_mount_params("host", "share1", "user", "pass")
+    params2 = testhelper.gen_mount_params("host", "share2", "user", "pass")
+    pool = testhelper.MountPool()
+    dir1 = pool.acquire(params1)
+    dir2 = pool.acquire(params1)
+    assert dir1 != dir2 and dir1.parent == dir2.parent
+    assert len(mounted) == 1
+    dir3 = pool.acquire(params2)
+    dir4 = pool.acquire(params1, "nosharesock")
+    assert len(mounted) == 3
+    dir6 = pool.acquire(params1, "nosharesock", instance=1)
+    assert len(mounted) == 4 and dir6.parent != dir4.parent
+    for test_dir in (dir1, dir2, dir3, dir4, dir6):
+        pool.release(test_dir)
+        assert not test_dir.exists()
+    healthy[0] = False
+    dir5 = pool.acquire(params1)
+    assert len(mounted) == 4
+    assert mounted[-1] == dir5.parent
+    pool.release(dir5)
+    mount_points = list(mounted)
+    pool.close()
+    assert not mounted
+    assert not any(mnt.exists() for mnt in mount_points)
+
+    # leaked test directories do not prevent teardown of other mounts
+    pool = testhelper.MountPool()
+    leaked = pool.acquire(params1)
+    pool.release(pool.acquire(params2))
+    with pytest.raises(AssertionError, match="still in use"):
+        pool.close()
+    assert not mounted
+    assert not leaked.parent.exists()
+
+
+def test_retry_policy():
+    retry = testhelper.RetryPolicy(attempts=5, delay=1, max_delay=3)
+    assert list(retry.delays()) == [1, 2, 3, 3]
+    assert list(testhelper.RetryPolicy(attempts=1).delays()) == []
+
+
+def test_run_mount_cmd():
+    retry = testhelper.RetryPolicy(attempts=3, delay=0.01)
+    result = testhelper.MountResult("mount", "src", Path("/"), ["false"])
+    testhelper.cmdhelper._run_mount_cmd(result, None, retry)
+    assert result.attempts == 3
+    assert result.returncode != 0
+    result = testhelper.MountResult("mount", "src", Path("/"), ["true"])
+    testhelper.cmdhelper._run_mount_cmd(result, None, retry)
+    assert result.attempts == 1
+    assert result.returncode == 0
+    assert result.elapsed > 0
+
+
+def test_get_mount_entry():
+    entry = testhelper.get_mount_entry(Path("/proc"))
+    assert entry is not None
+    assert entry[1] == "proc"
+    assert testhelper.get_mount_entry(Path("/proc/self")) is None
+
+
+class _FakeSharedFile:
+    def __init__(self, filename, is_directory, file_size=0):
+        self.filename = filename
+        self.isDirectory = is_directory
+        self.file_size = file_size
+
+
+class _FakeMessage:
+    def __init__(self, command, is_reply):
+        self.command = command
+        self.isReply = is_reply
+
+
+class _FakeConnection:
+    """In-memory stand-in of pysmb's SMBConnection over a shared tree"""
+
+    def __init__(self, tree=None):
+        self.alive = True
+        self.closed = False
+        self.echoes = 0
+        self.tree = tree if tree is not None else {"/": None}
+        self.lock = threading.Lock()
+
+    def echo(self, data, timeout=10):
+        self.echoes += 1
+        if not self.alive:
+            raise IOError("not connected")
+        return data
+
+    def close(self):
+        self.closed = True
+
+    def listPath(self, service_name, path):
+        path = posixpath.normpath(path)
+        assert self.tree[path] is None
+        names = [
+            p for p in self.tree if p != "/" and posixpath.dirname(p) == path
+        ]
+        return [_FakeSharedFile(".", True)] + [
+            _FakeSharedFile(posixpath.basename(p), self.tree[p] is None)
+            for p in names
+        ]
+
+    def getAttributes(self, service_name, path):
+        data = self.tree[path]
+        return _FakeSharedFile(
+            posixpath.basename(path), data is None, len(data or b"")
+        )
+
+    def createDirectory(self, service_name, path):
+        assert posixpath.dirname(path) in self.tree
+        self.tree[path] = None
+
+    def deleteDirectory(self, service_name, path):
+        assert self.listPath(service_name, path)[1:] == []
+        del self.tree[path]
+
+    def deleteFiles(self, service_name, path):
+        assert self.tree[path] is not None
+        del self.tree[path]
+
+    def storeFile(self, service_name, path, file_obj):
+        self.storeFileFromOffset(service_name, path, file_obj, 0, True)
+
+    def storeFileFromOffset(
+        self, service_name, path, file_obj, offset=0, truncate=False
+    ):
+        with self.lock:
+            if truncate or path not in self.tree:
+                self.tree[path] = bytearray()
+        while True:
+            data = file_obj.read(60000)
+            if not data:
+                break
+            with self.lock:
+                buf = self.tree[path]
+                if len(buf) < offset:
+                    buf.extend(bytes(offset - len(buf)))
+                end = offset + len(data)
+                buf[offset:end] = data
+            offset += len(data)
+
+    def retrieveFile(self, service_name, path, file_obj):
+        self.retrieveFileFromOffset(service_name, path, file_obj)
+
+    def retrieveFileFromOffset(
+        self, service_name, path, file_obj, offset=0, max_length=-1
+    ):
+        data = bytes(self.tree[path][offset:])
+        if max_length >= 0:
+            data = data[:max_length]
+        for pos in range(0, len(data), 50000):
+            file_obj.write(data[pos:][:50000])
+
+
+def test_smb_connection_pool(monkeypatch):
+    conns = []
+
+    def _new_connection(hostname, username, passwd):
+        conns.append(_FakeConnection())
+        return conns[-1]
+
+    monkeypatch.setattr(
+        testhelper.smbclient, "_new_connection", _new_connection
+    )
+    pool = testhelper.SMBConnectionPool(
+        max_conns=2, idle_timeout=60, echo_after=0
+    )
+    conn1 = pool.acquire("host", "share", "user", "pass")
+    conn2 = pool.acquire("host", "share", "user", "pass")
+    assert conn1 is not conn2
+    pool.release(conn1)
+    assert pool.acquire("host", "share", "user", "pass") is conn1
+    conn3 = pool.acquire("host", "share", "user2", "pass")
+    assert len(conns) == 3
+    pool.release(conn1)
+    conn1.alive = False
+    conn4 = pool.acquire("host", "share", "user", "pass")
+    assert conn4 is not conn1 and conn1.closed
+    pool.release(conn3)
+    pool.idle_timeout = -1
+    pool.release(conn4)
+    client = testhelper.SMBClient("host", "share", "user", "pass", pool)
+    assert client.ctx is conns[-1]
+    assert conn4.closed
+    client.disconnect()
+    pool.release(conn2)
+    pool.close()
+    assert all(conn.closed for conn in conns)
+
+
+def test_pattern_reader_verifier():
+    pattern = testhelper.DataPattern(5)
+    reader = testhelper.PatternReader(pattern, 1000, 70000)
+    verifier = testhelper.PatternVerifier(pattern, 1000)
+    while True:
+        data = reader.read(8192)
+        if not data:
+            break
+        verifier.write(data)
+    assert verifier.pos == 70000
+    assert verifier.mismatch == -1
+    verifier = testhelper.PatternVerifier(pattern, 0)
+    verifier.write(pattern.read(0, 100))
+    verifier.write(b"x" + pattern.read(101, 100))
+    verifier.write(b"y")
+    assert verifier.mismatch == 100
+
+
+def test_split_ranges():
+    split_ranges = testhelper.smbclient._split_ranges
+    assert split_ranges(0, 4, 4096) == []
+    assert split_ranges(100, 4, 4096) == [(0, 100)]
+    assert split_ranges(2**20, 4, 4096) == [
+        (0, 2**18),
+        (2**18, 2**18),
+        (2**19, 2**18),
+        (3 * 2**18, 2**18),
+    ]
+    ranges = split_ranges(10 * 4096 + 1, 3, 4096)
+    assert ranges == [(0, 4 * 4096), (4 * 4096, 4 * 4096), (8 * 4096, 8193)]
+
+
+def _fake_smbclient(monkeypatch):
+    tree = {"/": None}
+    monkeypatch.setattr(
+        testhelper.smbclient,
+        "_new_connection",
+        lambda hostname, username, passwd: _FakeConnection(tree),
+    )
+    return testhelper.SMBClient("host", "share", "user", "pass")
+
+
+def test_smbclient_streaming(monkeypatch):
+    smbclient = _fake_smbclient(monkeypatch)
+    pattern = testhelper.DataPattern(11)
+    reader = testhelper.PatternReader(pattern, 0, 300000)
+    stats = smbclient.write_file("/f", reader, chunk_size=4096)
+    assert stats.nbytes == 300000
+    assert smbclient.stat_size("/f") == 300000
+    assert smbclient.verify_file("/f", pattern).nbytes == 300000
+    assert smbclient.verify_file("/f", pattern, 7777, 100000).nbytes == 100000
+    with pytest.raises(IOError):
+        smbclient.verify_file("/f", testhelper.DataPattern(12))
+    with pytest.raises(IOError):
+        smbclient.verify_file("/f", pattern, 299999, 2)
+    smbclient.disconnect()
+
+
+def test_smbclient_striped(monkeypatch):
+    smbclient = _fake_smbclient(monkeypatch)
+    pattern = testhelper.DataPattern(13)
+    size = 10 * 2**16 + 123
+    stats = smbclient.write_file_striped(
+        "/f", pattern, size, 4, ["a", "b"], 2**16
+    )
+    assert stats.total.nbytes == size
+    assert [s for s, _ in stats.per_conn] == ["a", "b", "a", "b"]
+    assert sum(st.nbytes for _, st in stats.per_conn) == size
+    stats = smbclient.verify_file_striped("/f", pattern, size, 3, align=4096)
+    assert len(stats.per_conn) == 3
+    smbclient.disconnect()
+
+
+def test_smbclient_striped_failure(monkeypatch):
+    _fake_smbclient(monkeypatch).disconnect()
+    pool = testhelper.SMBConnectionPool(max_conns=2)
+    smbclient = testhelper.SMBClient("host", "share", "user", "pass", pool)
+    pattern = testhelper.DataPattern(14)
+    size = 4 * 2**16
+    smbclient.write_file_striped("/f", pattern, size, 2, align=2**16)
+    # failing stripes must not keep their connections from later calls
+    for _ in range(3):
+        with pytest.raises(IOError):
+            smbclient.verify_file_striped(
+                "/f", testhelper.DataPattern(15), size, 2, align=2**16
+            )
+    stats = smbclient.verify_file_striped("/f", pattern, size, 2, align=2**16)
+    assert stats.total.nbytes == size
+    smbclient.disconnect()
+    pool.close()
+
+
+def test_smbclient_tree_ops_round_trips(monkeypatch, tmp_path):
+    conns = []
+
+    def _new_connection(hostname, username, passwd):
+        conns.append(_FakeConnection(tree))
+        return conns[-1]
+
+    tree = {"/": None}
+    monkeypatch.setattr(
+        testhelper.smbclient, "_new_connection", _new_connection
+    )
+    pool = testhelper.SMBConnectionPool(max_conns=4)
+    smbclient = testhelper.SMBClient("host", "share", "user", "pass", pool)
+    src = tmp_path / "src"
+    src.mkdir()
+    for f in range(200):
+        (src / f"f{f}").write_bytes(bytes([f]))
+    smbclient.upload_tree(src, "/top", 4)
+    smbclient.rmtree("/top", 4)
+    # back-to-back reuse of pooled connections needs no echo
+    assert sum(conn.echoes for conn in conns) == 0
+    # a failed tree operation does not keep connections busy
+    for _ in range(5):
+        with pytest.raises(Exception):
+            smbclient.rmtree("/missing", 4)
+    assert len(list(smbclient.walk("/", 4))) == 1
+    smbclient.disconnect()
+    pool.close()
+
+
+def test_smbclient_tree_ops(monkeypatch, tmp_path):
+    smbclient = _fake_smbclient(monkeypatch)
+    src = tmp_path / "src"
+    for d in range(3):
+        (src / f"d{d}" / "sub").mkdir(parents=True)
+        for f in range(5):
+            (src / f"d{d}" / f"f{f}").write_bytes(bytes([d, f]))
+            (src / f"d{d}" / "sub" / f"f{f}").write_bytes(bytes([f, d]))
+    smbclient.upload_tree(src, "/top", 4)
+    walked = list(smbclient.walk("/top", 4))
+    assert walked[0][0] == "/top"
+    assert sorted(walked[0][1]) == ["d0", "d1", "d2"]
+    assert sum(len(files) for _, _, files in walked) == 30
+    dst = tmp_path / "dst"
+    smbclient.download_tree("/top", dst, 4)
+    for p in src.rglob("*"):
+        q = dst / p.relative_to(src)
+        assert p.is_dir() == q.is_dir()
+        if p.is_file():
+            assert p.read_bytes() == q.read_bytes()
+    smbclient.rmtree("/top", 4)
+    assert smbclient.listdir("/") == ["."]
+    assert smbclient.counters["unlink"] == 30
+    assert smbclient.counters["rmdir"] == 7
+    assert smbclient.counters["mkdir"] == 7
+    smbclient.disconnect()
+
+
+def test_percentile():
+    samples = list(range(100, 0, -1))
+    assert testhelper.percentile(samples, 50) == 50
+    assert testhelper.percentile(samples, 99) == 99
+    assert testhelper.percentile(samples, 100) == 100
+    assert testhelper.percentile(samples, 0) == 1
+    assert testhelper.percentile([], 50) == 0
+    summary = testhelper.summarize_latencies([0.5, 0.1, 0.3])
+    assert summary["count"] == 3
+    assert summary["p50"] == 0.3
+    assert summary["max"] == 0.5
+
+
+def test_data_pattern_find_mismatch():
+    pattern = testhelper.DataPattern(3)
+    data = bytearray(pattern.read(100, 3 * 2**20))
+    assert pattern.find_mismatch(data, 100) is None
+    data[5000:5010] = bytes(b ^ 0x55 for b in data[5000:5010])
+    data[9000] ^= 1
+    assert pattern.find_mismatch(data, 100) == (5000, 10)
+    data[-3:] = bytes(b ^ 0xAA for b in data[-3:])
+    assert pattern.find_mismatch(data[6000:], 6100) == (3000, 1)
+    assert pattern.find_mismatch(data[9001:], 9101) == (len(data) - 9004, 3)
+    # bytes which happen to match do not end a mismatching run
+    data[20000:20010] = bytes(b ^ 0x33 for b in data[20000:20010])
+    data[20004] ^= 0x33
+    assert pattern.find_mismatch(data[20000:], 20100) == (0, 10)
+
+
+def test_workload_profiles():
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    assert testconfig.workload_profile == "smoke"
+    export1 = testhelper.get_share(testconfig, "export1")
+    export2 = testhelper.get_share(testconfig, "export2")
+
+    smoke1 = testhelper.get_workload_profile(testconfig, export1)
+    assert smoke1.cases == [testhelper.WorkloadCase(65536, 4, 1, 1, "none")]
+    smoke2 = testhelper.get_workload_profile(testconfig, export2)
+    assert [(c.file_size, c.count) for c in smoke2.cases] == [
+        (4096, 1),
+        (2**24, 1),
+        (2**20, 10),
+        (1024, 100),
+    ]
+
+    nightly1 = export1.workloads["nightly"]
+    assert nightly1.cases == [
+        testhelper.WorkloadCase(2**24, 100, 10, 8, "none")
+    ]
+    nightly2 = export2.workloads["nightly"]
+    assert nightly2.cases == [
+        testhelper.WorkloadCase(2**30, 2, 1, 2, "file"),
+        testhelper.WorkloadCase(4096, 10000, 100, 16, "none"),
+    ]
+
+    testconfig2 = testhelper.load_test_config("test-info2.yml")
+    share = testhelper.get_share(testconfig2, "gluster-vol")
+    assert share.workloads["nightly"].cases[0].file_size == 2**30
+
+
+def test_punch_hole(tmp_path):
+    path = tmp_path / "sparse"
+    path.write_bytes(b"x" * 3 * 4096)
+    fd = os.open(path, os.O_RDWR)
+    try:
+        testhelper.punch_hole(fd, 4096, 4096)
+    except OSError as ex:
+        pytest.skip(f"punch hole unsupported: {ex}")
+    finally:
+        os.close(fd)
+    data = path.read_bytes()
+    assert data == b"x" * 4096 + bytes(4096) + b"x" * 4096
+
+
+def test_latency_histogram():
+    hist = testhelper.LatencyHistogram()
+    samples = [i / 1000000 for i in range(1, 100001)]
+    for sample in samples:
+        hist.record(sample)
+    assert hist.count == len(samples)
+    for pct in (1, 50, 90, 99, 99.9, 100):
+        exact = testhelper.percentile(samples, pct)
+        assert abs(hist.percentile(pct) - exact) <= exact / 32
+    assert hist.summary()["max"] == 0.1
+
+    low = testhelper.LatencyHistogram()
+    high = testhelper.LatencyHistogram()
+    for sample in samples:
+        (low if sample < 0.05 else high).record(sample)
+    low.merge(high)
+    assert low.counts == hist.counts
+    assert low.summary() == hist.summary()
+    assert testhelper.LatencyHistogram().percentile(50) == 0
+
+
+def test_write_report(monkeypatch, tmp_path):
+    monkeypatch.setenv("TEST_REPORT_DIR", str(tmp_path / "reports"))
+    hist = testhelper.LatencyHistogram()
+    hist.record(0.002)
+    path = testhelper.write_report("stress-share1", {"read": hist.summary()})
+    assert path == tmp_path / "reports" / "stress-share1.json"
+    assert json.loads(path.read_text())["read"]["p99"] == 0.002
+    monkeypatch.delenv("TEST_REPORT_DIR")
+    assert testhelper.get_report_dir().name == "sit-test-reports"
+
+
+def test_loadgen_config():
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    loadgen = testconfig.loadgen
+    assert loadgen.rates == [100, 200, 400, 800, 1600]
+    assert loadgen.step_duration == 60
+    assert loadgen.file_size == 2**16
+    loadgen = testhelper.make_test_config(
+        {"shares": {}, "loadgen": {"rates": 500}}
+    ).loadgen
+    assert loadgen.rates == [500]
+    assert loadgen.nfiles == 64
+
+
+def test_stress_config():
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    assert testconfig.stress.processes == 4
+    assert testconfig.stress.threads == 8
+    stress = testhelper.make_test_config({"shares": {}}).stress
+    assert stress.processes == 0 and stress.threads == 20
+    with pytest.raises(AssertionError):
+        testhelper.make_test_config({"shares": {}, "stress": {"threads": 0}})
+
+
+def test_metadata_config():
+    testconfig = testhelper.load_test_config("test-info1.yml")
+    metadata = testconfig.metadata
+    assert metadata.ops["create"] == 100 and metadata.seed == 1234
+    assert metadata.clients == 32 and metadata.ndirs == 2
+    metadata = testhelper.make_test_config({"shares": {}}).metadata
+    assert metadata.seed is None
+    assert set(metadata.ops) == {
+        "create",
+        "stat",
+        "readdir",
+        "rename",
+        "setattr",
+        "unlink",
+    }
+    with pytest.raises(AssertionError):
+        testhelper.make_test_config(
+            {"shares": {}, "metadata": {"ops": {"chmod": 1}}}
+        )
+
+
+def test_record_set():
+    records = testhelper.RecordSet(1234)
+    assert len(records.key(7)) == testhelper.RecordSet.KEY_SIZE
+    assert len(records.value(7)) == testhelper.RecordSet.VALUE_SIZE
+    assert records.value(7) != testhelper.RecordSet(1235).value(7)
+    assert records.value(7) != records.value(7, gen=1)
+    assert pickle.loads(pickle.dumps(records)).value(7) == records.value(7)
+    ikeys = [3, 1, 2]
+    vals = [val for _, val in records.items(ikeys)]
+    records.check(ikeys, vals)
+    with pytest.raises(ValueError, match="missing record: 1"):
+        records.check(ikeys, [vals[0], None, vals[2]])
+    with pytest.raises(ValueError, match="record mismatch: 2"):
+        records.check(ikeys, [vals[0], vals[1], vals[1]])
+    with pytest.raises(AssertionError):
+        records.check(ikeys, vals[:2])
+    batches = list(testhelper.batched(range(10), 4))
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_permuted_range():
+    rnd = random.Random(0)
+    for start, stop in [(0, 0), (0, 1), (5, 6), (10, 110), (0, 1024)]:
+        perm = list(testhelper.permuted_range(start, stop, rnd))
+        assert sorted(perm) == list(range(start, stop))
+
+
+def test_parse_cifs_flushes():
+    stats = "\n".join(
+        [
+            "Resources in use",
+            "CIFS Session: 1",
+            "  0\t\t1\t0\t\t0\t0",
+            "1) \\\\server\\share1",
+            "SMBs: 23",
+            "Flushes: 3 sent 0 failed",
+            "2) \\\\server\\share2\tDISCONNECTED ",
+            "Flushes: 5 sent 1 failed",
+            "3) \\\\Server\\Share1",
+            "Flushes: 4 sent 0 failed",
+        ]
+    )
+    parse = testhelper.cmdhelper._parse_cifs_flushes
+    assert parse(stats, "\\\\server\\share1") == 7
+    assert parse(stats, "\\\\server\\share2") == 5
+    assert parse(stats, "\\\\server\\share3") is None
+    assert testhelper.get_cifs_flush_count(Path("/")) is None
+
+
+def test_smbclient_tree_ops_pool_limit(monkeypatch, tmp_path):
+    _fake_smbclient(monkeypatch).disconnect()
+    pool = testhelper.SMBConnectionPool(max_conns=2)
+    smbclient = testhelper.SMBClient("host", "share", "user", "pass", pool)
+    src = tmp_path / "src"
+    for d in range(4):
+        (src / f"d{d}").mkdir(parents=True)
+        (src / f"d{d}" / "f").write_bytes(bytes([d]))
+    # more workers than the pool has connections, one held by the client
+    smbclient.upload_tree(src, "/top", 4)
+    assert len(list(smbclient.walk("/top", 4))) == 5
+    smbclient.rmtree("/top", 4)
+    assert smbclient.listdir("/") == ["."]
+    smbclient.disconnect()
+    pool.close()
+
+
+def test_timed_connection_tree_connect_stamps():
+    ctx = testhelper.smbclient._TimedSMBConnection(
+        "user", "pass", "smbclient", "host", use_ntlm_v2=True
+    )
+    tree_connect = testhelper.smbclient.SMB2_COM_TREE_CONNECT
+    ctx._stamp_tree_connect(_FakeMessage(0x5, False))
+    assert ctx.stamps == {}
+    ctx._stamp_tree_connect(_FakeMessage(tree_connect, False))
+    ctx._stamp_tree_connect(_FakeMessage(tree_connect, True))
+    stamps = dict(ctx.stamps)
+    assert stamps["tree_connected"] >= stamps["tree_connect"]
+    # only the first tree-connect of a connection is measured
+    ctx._stamp_tree_connect(_FakeMessage(tree_connect, True))
+    assert ctx.stamps == stamps
+
+
+def test_smb_connection_pool_release_on_error(monkeypatch):
+    monkeypatch.setattr(
+        testhelper.smbclient,
+        "_new_connection",
+        lambda hostname, username, passwd: _FakeConnection(),
+    )
+    pool = testhelper.SMBConnectionPool(max_conns=2)
+    for _ in range(2):
+        with pytest.raises(IOError):
+            with pool.connection("host", "share", "user", "pass"):
+                raise IOError("failed to verify")
+    with pytest.raises(testhelper.smbclient.base.NotConnectedError):
+        with pool.connection("host", "share", "user", "pass") as conn:
+            raise testhelper.smbclient.base.NotConnectedError()
+    assert conn.closed
+    conns = [pool.acquire("host", "share", "user", "pass") for _ in range(2)]
+    for conn in conns:
+        pool.release(conn)
+    with pool.connection("host", "share", "user", "pass"):
+        pass
+    pool.close()
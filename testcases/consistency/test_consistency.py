@@ -8,16 +8,16 @@
 
 import testhelper
 from testhelper import SMBClient
-import os
 import pytest
 import typing
 
 test_string = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-test_info_file = os.getenv("TEST_INFO_FILE")
-test_info = testhelper.read_yaml(test_info_file)
+test_info = testhelper.get_test_config()
 
 
-def consistency_check(hostname: str, share_name: str) -> None:
+def consistency_check(
+    hostname: str, share_name: str, smb_pool: testhelper.SMBConnectionPool
+) -> None:
     mount_params = testhelper.get_mount_parameters(test_info, share_name)
     test_filename = "/test_consistency"
 
@@ -27,6 +27,7 @@ def consistency_check(hostname: str, share_name: str) -> None:
         mount_params["share"],
         mount_params["username"],
         mount_params["password"],
+        pool=smb_pool,
     )
     smbclient.write_text(test_filename, test_string)
     smbclient.disconnect()
@@ -37,6 +38,7 @@ def consistency_check(hostname: str, share_name: str) -> None:
         mount_params["share"],
         mount_params["username"],
         mount_params["password"],
+        pool=smb_pool,
     )
     retstr = smbclient.read_text(test_filename)
     smbclient.unlink(test_filename)
@@ -49,10 +51,12 @@ def generate_consistency_check() -> typing.List[typing.Tuple[str, str]]:
     arr = []
     for sharename in testhelper.get_exported_shares(test_info):
         share = testhelper.get_share(test_info, sharename)
-        arr.append((share["server"], share["name"]))
+        arr.append((share.server, share.name))
     return arr
 
 
 @pytest.mark.parametrize("hostname,share_name", generate_consistency_check())
-def test_consistency(hostname: str, share_name: str) -> None:
-    consistency_check(hostname, share_name)
+def test_consistency(
+    hostname: str, share_name: str, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    consistency_check(hostname, share_name, smb_pool)
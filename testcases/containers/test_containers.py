@@ -7,7 +7,6 @@
 # ip addresses).
 
 import testhelper
-import os
 import pytest
 import typing
 import yaml
@@ -17,8 +16,6 @@ import shutil
 script_root = Path(__file__).resolve().parent
 container_tests_file = script_root / "test_containers.yml"
 
-# Use a global test_info to get a better output when running pytest
-test_info: typing.Dict[str, typing.Any] = {}
 # global containing tests read from yaml
 container_tests: typing.Dict[str, str] = {}
 
@@ -35,7 +32,7 @@ def load_container_tests() -> int:
 
 
 # Load globals
-test_info = testhelper.read_yaml(os.getenv("TEST_INFO_FILE"))
+test_info = testhelper.get_test_config()
 assert load_container_tests() != 0, "No tests loaded"
 
 
@@ -51,24 +48,22 @@ def containers_check_mounted(mount_point: Path, test: str) -> None:
         shutil.rmtree(test_dir, ignore_errors=True)
 
 
-def containers_check(ipaddr: str, share_name: str, test: str) -> None:
+def containers_check(
+    mount_pool: testhelper.MountPool, ipaddr: str, share_name: str, test: str
+) -> None:
     mount_params = testhelper.get_mount_parameters(test_info, share_name)
     mount_params["host"] = ipaddr
-    tmp_root = testhelper.get_tmp_root()
-    mount_point = testhelper.get_tmp_mount_point(tmp_root)
-    testhelper.cifs_mount(mount_params, mount_point)
+    test_root = mount_pool.acquire(mount_params)
     try:
-        containers_check_mounted(mount_point, test)
+        containers_check_mounted(test_root, test)
     finally:
-        testhelper.cifs_umount(mount_point)
-        mount_point.rmdir()
-        tmp_root.rmdir()
+        mount_pool.release(test_root)
 
 
 def generate_containers_test() -> typing.List[typing.Tuple[str, str, str]]:
     arr = []
     for share_name in testhelper.get_exported_shares(test_info):
-        server = testhelper.get_share(test_info, share_name)["server"]
+        server = testhelper.get_share(test_info, share_name).server
         for test in container_tests.keys():
             arr.append((server, share_name, test))
     return arr
@@ -79,5 +74,7 @@ def generate_containers_test() -> typing.List[typing.Tuple[str, str, str]]:
     "ipaddr,share_name,test",
     generate_containers_test(),
 )
-def test_containers(ipaddr: str, share_name: str, test: str) -> None:
-    containers_check(ipaddr, share_name, test)
+def test_containers(
+    mount_pool: testhelper.MountPool, ipaddr: str, share_name: str, test: str
+) -> None:
+    containers_check(mount_pool, ipaddr, share_name, test)
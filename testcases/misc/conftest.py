@@ -1,33 +1,25 @@
 #!/usr/bin/env python3
 
 import pytest
-import os
-import shutil
 import testhelper
 import typing
 from pathlib import Path
 
-test_info_file = os.getenv("TEST_INFO_FILE")
-test_info = testhelper.read_yaml(test_info_file)
+test_info = testhelper.get_test_config()
 
 
 @pytest.fixture
 def setup_mount(
     request: pytest.FixtureRequest,
+    mount_pool: testhelper.MountPool,
 ) -> typing.Generator[Path, None, None]:
     ipaddr, share_name = request.param
-    flag_mounted: bool = False
-    tmp_root = testhelper.get_tmp_root()
-    mount_point = testhelper.get_tmp_mount_point(tmp_root)
     try:
         mount_params = testhelper.get_mount_parameters(test_info, share_name)
         mount_params["host"] = ipaddr
 
-        # mount cifs share
-        testhelper.cifs_mount(mount_params, mount_point)
-        flag_mounted = True
-        test_dir = mount_point / "mount_test"
-        test_dir.mkdir()
+        # get a private directory within a pooled cifs mount of the share
+        test_dir = mount_pool.acquire(mount_params)
     except Exception as e:
         raise Exception(f"Setup failed: {str(e)}")
 
@@ -36,25 +28,104 @@ def setup_mount(
 
     # Perform teardown after the test has run
     try:
-        if flag_mounted and test_dir:
-            shutil.rmtree(test_dir, ignore_errors=True)
-            testhelper.cifs_umount(mount_point)
-        mount_point.rmdir()
-        tmp_root.rmdir()
+        mount_pool.release(test_dir)
     except Exception as e:
         raise Exception(f"Teardown failed: {str(e)}")
 
 
+@pytest.fixture
+def setup_mounts(
+    request: pytest.FixtureRequest,
+    mount_pool: testhelper.MountPool,
+) -> typing.Generator[typing.List[typing.Tuple[str, Path]], None, None]:
+    """Private directories within several independent mounts of a share.
+
+    Mounts are spread round-robin across the public interfaces of the
+    share, and use nosharesock so that each has its own connection.
+    Yields a list of (interface, test directory) per mount.
+    """
+    share_name, nmounts = request.param
+    share = testhelper.get_share(test_info, share_name)
+    interfaces = testhelper.get_public_interfaces(test_info, share)
+    mounts: typing.List[typing.Tuple[str, Path]] = []
+    try:
+        for idx in range(nmounts):
+            ipaddr = interfaces[idx % len(interfaces)]
+            mount_params = testhelper.get_mount_parameters(
+                test_info, share_name
+            )
+            mount_params["host"] = ipaddr
+            test_dir = mount_pool.acquire(
+                mount_params, "nosharesock", idx // len(interfaces)
+            )
+            mounts.append((ipaddr, test_dir))
+    except Exception as e:
+        for _, test_dir in mounts:
+            mount_pool.release(test_dir)
+        raise Exception(f"Setup failed: {str(e)}")
+
+    yield mounts
+
+    try:
+        for _, test_dir in mounts:
+            mount_pool.release(test_dir)
+    except Exception as e:
+        raise Exception(f"Teardown failed: {str(e)}")
+
+
+@pytest.fixture
+def share(request: pytest.FixtureRequest) -> testhelper.Share:
+    """The share under test, for tests parametrized with setup_mount (via
+    gen_params), setup_mounts (via gen_params_multi) or with test_dir (via
+    gen_params_premounted)"""
+    params = request.node.callspec.params
+    if "setup_mount" in params:
+        _, share_name = params["setup_mount"]
+        return testhelper.get_share(test_info, share_name)
+    if "setup_mounts" in params:
+        share_name, _ = params["setup_mounts"]
+        return testhelper.get_share(test_info, share_name)
+    test_dir = Path(params["test_dir"])
+    for s in test_info.premounted_shares:
+        if s.path == test_dir:
+            return s
+    raise Exception(f"No share for {test_dir}")
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: typing.List[pytest.Item]
+) -> None:
+    # long benchmark sweeps are opt-in, see benchmarks in test-info
+    if test_info.benchmarks:
+        return
+    deselected = [item for item in items if "benchmark" in item.keywords]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item not in deselected]
+
+
 def gen_params() -> typing.List[typing.Any]:
     exported_sharenames = testhelper.get_exported_shares(test_info)
     arr = []
     for share_name in exported_sharenames:
-        server = testhelper.get_share(test_info, share_name)["server"]
+        server = testhelper.get_share(test_info, share_name).server
         arr.append(
             pytest.param((server, share_name), id=f"{server}-{share_name}")
         )
     return arr
 
 
+def gen_params_multi() -> typing.List[typing.Any]:
+    arr = []
+    for share_name in testhelper.get_exported_shares(test_info):
+        for nmounts in test_info.multi_mounts:
+            arr.append(
+                pytest.param(
+                    (share_name, nmounts), id=f"{share_name}-mounts{nmounts}"
+                )
+            )
+    return arr
+
+
 def gen_params_premounted() -> typing.List[Path]:
     return testhelper.get_premounted_shares(test_info)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# Compare embedded database engines via SMB mount-point: run the same
+# insert, lookup, update and scan workload through dbm.gnu, dbm.ndbm,
+# dbm.dumb and sqlite3 (WAL and rollback journal modes), and report
+# operations per second, sync points and file growth per engine.
+
+import pytest
+import importlib
+import random
+import shutil
+import sqlite3
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import gen_params, gen_params_premounted
+
+_num_records = 100000
+# Number of operations per transaction (or between syncs of dbm engines)
+_batch_size = 1000
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _DbmEngine:
+    """Key-value store over one of dbm's implementation modules"""
+
+    def __init__(self, module_name: str, path: Path) -> None:
+        try:
+            self.module: typing.Any = importlib.import_module(module_name)
+        except ImportError as ex:
+            raise _Unsupported(str(ex))
+        self.path = path
+
+    def open(self) -> None:
+        self.db = self.module.open(str(self.path), "n", 0o600)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def put(self, key: bytes, val: bytes) -> None:
+        self.db[key] = val
+
+    def get(self, key: bytes) -> typing.Optional[bytes]:
+        return self.db.get(key)
+
+    def commit(self) -> None:
+        # not all implementations support sync (e.g. dbm.ndbm)
+        if hasattr(self.db, "sync"):
+            self.db.sync()
+
+    def scan(self) -> typing.Iterator[typing.Tuple[bytes, bytes]]:
+        for key in self.db.keys():
+            yield (key, self.db[key])
+
+
+class _SqliteEngine:
+    """Key-value store as a single sqlite3 table, in given journal mode"""
+
+    def __init__(self, journal_mode: str, path: Path) -> None:
+        self.journal_mode = journal_mode
+        self.path = path
+
+    def open(self) -> None:
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None)
+        row = self.conn.execute(
+            f"PRAGMA journal_mode={self.journal_mode}"
+        ).fetchone()
+        if row[0].lower() != self.journal_mode.lower():
+            self.conn.close()
+            raise _Unsupported(f"journal_mode={row[0]}")
+        self.conn.execute(
+            "CREATE TABLE kv (k BLOB PRIMARY KEY, v BLOB NOT NULL) "
+            "WITHOUT ROWID"
+        )
+        self.conn.execute("BEGIN")
+
+    def close(self) -> None:
+        self.conn.execute("COMMIT")
+        self.conn.close()
+
+    def put(self, key: bytes, val: bytes) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, val)
+        )
+
+    def get(self, key: bytes) -> typing.Optional[bytes]:
+        row = self.conn.execute("SELECT v FROM kv WHERE k = ?", (key,))
+        res = row.fetchone()
+        return res[0] if res else None
+
+    def commit(self) -> None:
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+
+    def scan(self) -> typing.Iterator[typing.Tuple[bytes, bytes]]:
+        yield from self.conn.execute("SELECT k, v FROM kv")
+
+
+_Engine = typing.Union[_DbmEngine, _SqliteEngine]
+
+_engines: typing.Dict[str, typing.Callable[[Path], _Engine]] = {
+    "dbm.gnu": lambda path: _DbmEngine("dbm.gnu", path),
+    "dbm.ndbm": lambda path: _DbmEngine("dbm.ndbm", path),
+    "dbm.dumb": lambda path: _DbmEngine("dbm.dumb", path),
+    "sqlite-wal": lambda path: _SqliteEngine("wal", path),
+    "sqlite-delete": lambda path: _SqliteEngine("delete", path),
+}
+
+
+class _Workload:
+    """Insert, lookup, update and scan phases over a set of records.
+
+    Each phase returns its number of operations and of commits. The first
+    half of the keys is updated to generation 1, which scan verifies.
+    """
+
+    def __init__(self, engine: _Engine, nrecs: int) -> None:
+        self.engine = engine
+        self.nrecs = nrecs
+        self.rnd = random.Random(random.getrandbits(64))
+        self.records = testhelper.RecordSet(self.rnd.getrandbits(64))
+
+    def _put_all(
+        self, ikeys: typing.Iterable[int], gen: int
+    ) -> typing.Tuple[int, int]:
+        nops = commits = 0
+        for batch in testhelper.batched(ikeys, _batch_size):
+            for key, val in self.records.items(batch, gen):
+                self.engine.put(key, val)
+            self.engine.commit()
+            nops += len(batch)
+            commits += 1
+        return (nops, commits)
+
+    def insert(self) -> typing.Tuple[int, int]:
+        return self._put_all(range(self.nrecs), 0)
+
+    def lookup(self) -> typing.Tuple[int, int]:
+        ikeys = testhelper.permuted_range(
+            self.nrecs // 2, self.nrecs, self.rnd
+        )
+        nops = 0
+        for batch in testhelper.batched(ikeys, _batch_size):
+            vals = [self.engine.get(self.records.key(i)) for i in batch]
+            self.records.check(batch, vals)
+            nops += len(batch)
+        return (nops, 0)
+
+    def update(self) -> typing.Tuple[int, int]:
+        ikeys = testhelper.permuted_range(0, self.nrecs // 2, self.rnd)
+        return self._put_all(ikeys, 1)
+
+    def scan(self) -> typing.Tuple[int, int]:
+        nops = 0
+        for key, val in self.engine.scan():
+            ikey = int.from_bytes(key, "big")
+            gen = 1 if ikey < self.nrecs // 2 else 0
+            self.records.check([ikey], [val], gen)
+            nops += 1
+        if nops != self.nrecs:
+            raise ValueError(f"scan mismatch: {nops} != {self.nrecs}")
+        return (nops, 0)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir())
+
+
+def _run_engine(
+    dirpath: Path, engine: _Engine
+) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    workload = _Workload(engine, _num_records)
+    results = {}
+    engine.open()
+    try:
+        for phase in ["insert", "lookup", "update", "scan"]:
+            flushes0 = testhelper.get_cifs_flush_count(dirpath)
+            start = time.monotonic()
+            nops, commits = getattr(workload, phase)()
+            elapsed = max(time.monotonic() - start, 1e-9)
+            flushes1 = testhelper.get_cifs_flush_count(dirpath)
+            flushes = None
+            if flushes0 is not None and flushes1 is not None:
+                flushes = flushes1 - flushes0
+            results[phase] = {
+                "ops_per_sec": nops / elapsed,
+                "commits": commits,
+                "flushes": flushes,
+                "size": _dir_size(dirpath),
+            }
+    finally:
+        engine.close()
+    return results
+
+
+def _run_db_benchmark(base: Path) -> typing.Dict[str, typing.Any]:
+    report: typing.Dict[str, typing.Any] = {"records": _num_records}
+    for name, make_engine in _engines.items():
+        dirpath = base / name
+        dirpath.mkdir()
+        try:
+            results = _run_engine(dirpath, make_engine(dirpath / "db"))
+        except _Unsupported as ex:
+            print(f"{name}: unsupported ({ex})")
+            report[name] = {"unsupported": str(ex)}
+            continue
+        finally:
+            shutil.rmtree(dirpath, ignore_errors=True)
+        report[name] = results
+        for phase, res in results.items():
+            print(
+                f"{name} {phase}: {res['ops_per_sec']:.1f}ops/s "
+                f"commits={res['commits']} flushes={res['flushes']} "
+                f"size={res['size']}"
+            )
+    return report
+
+
+def _run_db_benchmarks(directory: Path, share: testhelper.Share) -> None:
+    print()
+    directory.mkdir(exist_ok=True)
+    try:
+        report = _run_db_benchmark(directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    report["share"] = share.name
+    path = testhelper.write_report(f"dbbench-{share.name}", report)
+    print(f"Report: {path}")
+
+
+@pytest.mark.benchmark
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_db_engines(setup_mount: Path, share: testhelper.Share) -> None:
+    base = setup_mount / "db-bench"
+    _run_db_benchmarks(base, share)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_db_engines_premounted(
+    test_dir: Path, share: testhelper.Share
+) -> None:
+    base = test_dir / "db-bench"
+    _run_db_benchmarks(base, share)
@@ -3,90 +3,60 @@
 
 import pytest
 import dbm
-import hashlib
-import pickle
+import random
 import shutil
 import typing
-import random
+import testhelper
 from pathlib import Path
-from .conftest import gen_params, gen_params_premounted
-
-
-class Record:
-    def __init__(self, ikey: int) -> None:
-        self.key = str(ikey)
-        self.val = self._hashof(self.key)
-        self.rnd = random.randint(0, 0x3FFFFFFF)
-
-    def ikey(self) -> int:
-        return int(self.key)
-
-    def has_val_of(self, key: str) -> bool:
-        return self.val == self._hashof(key)
+from .conftest import test_info, gen_params, gen_params_premounted
 
-    @staticmethod
-    def _hashof(key: str) -> str:
-        kh = hashlib.sha3_512(key.encode())
-        return kh.hexdigest()
-
-
-def _check_consistent(rec: Record) -> None:
-    if not rec.has_val_of(rec.key):
-        raise ValueError(f"not consistent: {rec.key} {rec.val}")
-
-
-def _check_equal(rec1: Record, rec2: Record) -> None:
-    if rec1.key != rec2.key:
-        raise ValueError(f"key mismatch: {rec1.key} != {rec2.key}")
-    if rec1.val != rec2.val:
-        raise ValueError(f"value mismatch: {rec1.val} != {rec2.val}")
-    if rec1.rnd != rec2.rnd:
-        raise ValueError(f"random-tag mismatch: {rec1.rnd} != {rec2.rnd}")
+_record_counts = [10, 100, 10000]
+# Large databases only as part of opt-in benchmarks, see test-info
+if test_info.benchmarks:
+    _record_counts.append(1000000)
+_batch_size = 1024
+# File name suffixes used by dbm.gnu, dbm.ndbm and dbm.dumb
+_db_suffixes = ["", ".db", ".dat", ".dir", ".bak", ".pag"]
 
 
 class Database:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, records: testhelper.RecordSet) -> None:
         self.path = path
+        self.records = records
 
     def create(self) -> None:
         self.db = dbm.open(str(self.path), flag="n", mode=0o600)
 
     def destroy(self):
         self.db.close()
-        self.path.unlink()
-
-    def store(self, recs: typing.List[Record]) -> None:
-        for rec in recs:
-            db_val = pickle.dumps(rec)
-            self.db[rec.key] = db_val
-
-    def query(self, recs: typing.List[Record]) -> None:
-        for rec in recs:
-            db_val = self.db.get(rec.key)
-            rec2 = pickle.loads(db_val)  # type: ignore
-            _check_consistent(rec2)
-            _check_equal(rec, rec2)
+        # some dbm implementations add suffixes, or use several files
+        for suffix in _db_suffixes:
+            self.path.with_name(self.path.name + suffix).unlink(
+                missing_ok=True
+            )
 
+    def store(self, ikeys: typing.Iterable[int]) -> None:
+        for key, val in self.records.items(ikeys):
+            self.db[key] = val
 
-def _make_records(ikeys: typing.Iterable[int]) -> typing.List[Record]:
-    return [Record(ikey) for ikey in ikeys]
+    def query(self, ikeys: typing.Iterable[int]) -> None:
+        for batch in testhelper.batched(ikeys, _batch_size):
+            vals = [self.db.get(self.records.key(ikey)) for ikey in batch]
+            self.records.check(batch, vals)
 
 
 def _check_dbm_consistency(base: Path, nrecs: int) -> None:
     path = base / f"dbm-{nrecs}"
-    recs1 = _make_records(range(0, int(nrecs / 2)))
-    recs2 = _make_records(range(int(nrecs / 2), nrecs))
-    recs = recs1 + recs2
-    db = Database(path)
+    rnd = random.Random(random.getrandbits(64))
+    half = nrecs // 2
+    db = Database(path, testhelper.RecordSet(rnd.getrandbits(64)))
     db.create()
     try:
-        db.store(recs1)
-        db.query(recs1)
-        random.shuffle(recs1)
-        db.query(recs1)
-        random.shuffle(recs2)
-        db.store(recs2)
-        db.query(recs)
+        db.store(range(0, half))
+        db.query(range(0, half))
+        db.query(testhelper.permuted_range(0, half, rnd))
+        db.store(testhelper.permuted_range(half, nrecs, rnd))
+        db.query(testhelper.permuted_range(0, nrecs, rnd))
     finally:
         db.destroy()
 
@@ -94,9 +64,8 @@ def _check_dbm_consistency(base: Path, nrecs: int) -> None:
 def _run_dbm_consistency_checks(base_path: Path) -> None:
     base_path.mkdir(exist_ok=True)
     try:
-        _check_dbm_consistency(base_path, 10)
-        _check_dbm_consistency(base_path, 100)
-        _check_dbm_consistency(base_path, 10000)
+        for nrecs in _record_counts:
+            _check_dbm_consistency(base_path, nrecs)
     finally:
         shutil.rmtree(base_path, ignore_errors=True)
 
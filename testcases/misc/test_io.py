@@ -3,36 +3,46 @@
 # Test various file-system I/O operations via local SMB mount-point.
 
 import pytest
+import concurrent.futures
 import datetime
+import itertools
+import os
 import shutil
 import typing
 import testhelper
 import random
+import time
 from pathlib import Path
-from .conftest import gen_params, gen_params_premounted
+from .conftest import gen_params, gen_params_multi, gen_params_premounted
+from .conftest import test_info
 
 
 class DataPath:
-    """A pair of random data-buffer and path-name to its regular file"""
+    """A pair of random data-pattern and path-name to its regular file"""
 
-    def __init__(self, path: Path, size: int) -> None:
+    CHUNK_SIZE = 2**20
+
+    def __init__(self, path: Path, size: int, fsync: bool = False) -> None:
         self.path = path
         self.size = size
-        self.data = testhelper.generate_random_bytes(size)
+        self.fsync = fsync
+        self.pattern = testhelper.make_data_pattern()
 
     def renew(self) -> None:
-        self.data = testhelper.generate_random_bytes(self.size)
+        self.pattern = testhelper.make_data_pattern()
 
     def write(self) -> None:
-        self.path.write_bytes(self.data)
+        with open(self.path, "wb") as f:
+            for chunk in self.pattern.chunks(0, self.size, self.CHUNK_SIZE):
+                f.write(chunk)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
 
     def overwrite(self) -> None:
         self.renew()
         self.write()
 
-    def read(self) -> bytes:
-        return self.path.read_bytes()
-
     def mkdirs(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -54,12 +64,23 @@ class DataPath:
             )
 
     def verify_data(self) -> None:
-        data = self.read()
-        dlen = len(data)
-        if dlen != self.size:
-            raise IOError(f"data length mismatch: {dlen} != {self.size}")
-        if data != self.data:
-            raise IOError(f"data mismatch at {self.path}")
+        buf = memoryview(bytearray(min(self.size, self.CHUNK_SIZE) or 1))
+        pos = 0
+        with open(self.path, "rb", buffering=0) as f:
+            while True:
+                nread = f.readinto(buf)
+                if not nread:
+                    break
+                mismatch = self.pattern.find_mismatch(buf[:nread], pos)
+                if mismatch is not None:
+                    off, cnt = mismatch
+                    raise IOError(
+                        f"data mismatch at {self.path}: "
+                        f"offset={pos + off} length={cnt}"
+                    )
+                pos += nread
+        if pos != self.size:
+            raise IOError(f"data length mismatch: {pos} != {self.size}")
 
     def verify_noent(self) -> None:
         has_stat = False
@@ -72,52 +93,110 @@ class DataPath:
             raise IOError(f"still exists: {self.path}")
 
 
-def _make_pathname(base: Path, idx: int) -> Path:
+def _make_pathname(base: Path, idx: int, fanout: int = 1) -> Path:
+    if fanout > 1:
+        return base / f"d{idx % fanout}" / str(idx)
     return base / str(idx)
 
 
-def _make_datapath(base: Path, idx: int, size: int) -> DataPath:
-    return DataPath(_make_pathname(base, idx), size)
-
-
-def _make_datasets(base: Path, size: int, count: int) -> typing.List[DataPath]:
-    return [_make_datapath(base, idx, size) for idx in range(0, count)]
-
-
-def _run_checks(dsets: typing.List[DataPath]) -> None:
-    for dset in dsets:
-        dset.mkdirs()
-    for dset in dsets:
-        dset.write()
-    for dset in dsets:
-        dset.verify()
-    for dset in dsets:
-        dset.overwrite()
-    for dset in dsets:
-        dset.verify()
-    for dset in dsets:
-        dset.unlink()
-    for dset in dsets:
-        dset.verify_noent()
+def _make_datapath(
+    base: Path, idx: int, case: testhelper.WorkloadCase
+) -> DataPath:
+    path = _make_pathname(base, idx, case.fanout)
+    return DataPath(path, case.file_size, case.fsync == "file")
+
+
+def _make_datasets(
+    bases: typing.List[Path], case: testhelper.WorkloadCase
+) -> typing.List[DataPath]:
+    # spread datasets round-robin across bases, which may be distinct mounts
+    return [
+        _make_datapath(bases[idx % len(bases)], idx, case)
+        for idx in range(0, case.count)
+    ]
+
+
+_phases = [
+    "mkdirs",
+    "write",
+    "verify",
+    "overwrite",
+    "verify",
+    "unlink",
+    "verify_noent",
+]
+
+
+def _run_phase(dset: DataPath, phase: str) -> DataPath:
+    getattr(dset, phase)()
+    return dset
+
+
+def _make_executor(
+    workers: int, use_processes: bool
+) -> concurrent.futures.Executor:
+    if use_processes:
+        # re-seed workers so that forked processes do not share state
+        return concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=random.seed
+        )
+    return concurrent.futures.ThreadPoolExecutor(workers)
+
+
+def _run_checks(
+    dsets: typing.List[DataPath], workers: int = 1, use_processes: bool = False
+) -> None:
+    """Run all phases over datasets, with a barrier after each phase.
+
+    With more than one worker, the datasets of each phase are processed
+    concurrently by a pool of threads, or of processes if use_processes.
+    Wall time and operations per second are reported for each phase.
+    """
+    executor = None
+    if workers > 1:
+        executor = _make_executor(workers, use_processes)
+    try:
+        for phase in _phases:
+            start = time.monotonic()
+            if executor is None:
+                for dset in dsets:
+                    _run_phase(dset, phase)
+            else:
+                # workers may be processes: keep their copies of datasets
+                phases = itertools.repeat(phase)
+                dsets = list(executor.map(_run_phase, dsets, phases))
+            elapsed = max(time.monotonic() - start, 1e-9)
+            print(
+                f"{phase}: files={len(dsets)} workers={workers} "
+                f"time={elapsed:.3f}s ops/sec={len(dsets) / elapsed:.1f}"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 
-def _check_io_consistency(base: Path) -> None:
+def _check_io_consistency(
+    bases: typing.List[Path],
+    profile: testhelper.WorkloadProfile,
+    workers: typing.Optional[int] = None,
+    use_processes: bool = False,
+) -> None:
     try:
         print("\n")
-        base.mkdir()
-        # Case-1: single 4K file
-        _run_checks(_make_datasets(base, 4096, 1))
-        # Case-2: single 16M file
-        _run_checks(_make_datasets(base, 2**24, 1))
-        # Case-3: few 1M files
-        _run_checks(_make_datasets(base, 2**20, 10))
-        # Case-4: many 1K files
-        _run_checks(_make_datasets(base, 1024, 100))
+        for base in bases:
+            base.mkdir()
+        for case in profile.cases:
+            print(f"{profile.name}: mounts={len(bases)} {case}")
+            _run_checks(
+                _make_datasets(bases, case),
+                workers or case.concurrency,
+                use_processes,
+            )
     except Exception as ex:
         print("Error while executing test_io_consistency: %s", ex)
         raise
     finally:
-        if base:
+        for base in bases:
             shutil.rmtree(base, ignore_errors=True)
 
 
@@ -127,19 +206,72 @@ def _reset_random_seed() -> None:
     random.seed(seed)
 
 
-def _perform_io_consistency_check(directory: Path) -> None:
+def _perform_io_consistency_check(
+    directories: typing.List[Path],
+    share: testhelper.Share,
+    workers: typing.Optional[int] = None,
+    use_processes: bool = False,
+) -> None:
     _reset_random_seed()
-    _check_io_consistency(directory)
+    profile = testhelper.get_workload_profile(test_info, share)
+    _check_io_consistency(directories, profile, workers, use_processes)
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_check_io_consistency(
+    setup_mount: Path, share: testhelper.Share
+) -> None:
+    base = setup_mount / "test_io_consistency"
+    _perform_io_consistency_check([base], share)
+
+
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_check_io_consistency_premounted(
+    test_dir: Path, share: testhelper.Share
+) -> None:
+    base = test_dir / "test_io_consistency"
+    _perform_io_consistency_check([base], share)
+
+
+concurrent_params = [
+    pytest.param(8, False, id="threads8"),
+    pytest.param(8, True, id="procs8"),
+]
 
 
 @pytest.mark.privileged
+@pytest.mark.parametrize("workers,use_processes", concurrent_params)
 @pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
-def test_check_io_consistency(setup_mount: Path) -> None:
+def test_check_io_consistency_concurrent(
+    setup_mount: Path,
+    share: testhelper.Share,
+    workers: int,
+    use_processes: bool,
+) -> None:
     base = setup_mount / "test_io_consistency"
-    _perform_io_consistency_check(base)
+    _perform_io_consistency_check([base], share, workers, use_processes)
 
 
+@pytest.mark.parametrize("workers,use_processes", concurrent_params)
 @pytest.mark.parametrize("test_dir", gen_params_premounted())
-def test_check_io_consistency_premounted(test_dir: Path) -> None:
+def test_check_io_consistency_concurrent_premounted(
+    test_dir: Path,
+    share: testhelper.Share,
+    workers: int,
+    use_processes: bool,
+) -> None:
     base = test_dir / "test_io_consistency"
-    _perform_io_consistency_check(base)
+    _perform_io_consistency_check([base], share, workers, use_processes)
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mounts", gen_params_multi(), indirect=True)
+def test_check_io_consistency_multi(
+    setup_mounts: typing.List[typing.Tuple[str, Path]],
+    share: testhelper.Share,
+) -> None:
+    bases = [test_dir / "test_io_consistency" for _, test_dir in setup_mounts]
+    nodes = len({ipaddr for ipaddr, _ in setup_mounts})
+    print(f"\nmounts={len(bases)} nodes={nodes}")
+    _perform_io_consistency_check(bases, share, 8, True)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# Measure random read/write IOPS and latency via SMB mount-point, as queue
+# depth (number of concurrent workers issuing I/O) grows.
+
+import pytest
+import concurrent.futures
+import errno
+import mmap
+import os
+import random
+import shutil
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import gen_params, gen_params_premounted
+
+_file_size = 2**28
+_block_size = 4096
+_queue_depths = [1, 2, 4, 8, 16, 32, 64]
+_workloads = ["randread", "randwrite"]
+_duration = 5.0
+# p99 latency growth, relative to queue-depth 1, which marks the knee
+_knee_factor = 4.0
+
+
+def _open_file(path: Path) -> typing.Tuple[int, bool]:
+    flags = os.O_CREAT | os.O_RDWR
+    try:
+        return (os.open(path, flags | os.O_DIRECT, 0o600), True)
+    except OSError as ex:
+        if ex.errno != errno.EINVAL:
+            raise
+    return (os.open(path, flags, 0o600), False)
+
+
+def _prealloc_file(fd: int, pattern: testhelper.DataPattern) -> None:
+    with mmap.mmap(-1, 2**20) as buf:
+        for off in range(0, _file_size, len(buf)):
+            pattern.fill(memoryview(buf), off)
+            os.pwritev(fd, [buf], off)
+    os.fsync(fd)
+
+
+def _iops_worker(
+    fd: int,
+    pattern: testhelper.DataPattern,
+    workload: str,
+    deadline: float,
+    seed: int,
+) -> testhelper.LatencyHistogram:
+    rnd = random.Random(seed)
+    hist = testhelper.LatencyHistogram()
+    nblocks = _file_size // _block_size
+    # anonymous mappings are page aligned, as O_DIRECT requires
+    with mmap.mmap(-1, _block_size) as buf, memoryview(buf) as view:
+        while time.monotonic() < deadline:
+            off = rnd.randrange(nblocks) * _block_size
+            if workload == "randread":
+                start = time.perf_counter()
+                nbytes = os.preadv(fd, [buf], off)
+                hist.record(time.perf_counter() - start)
+                if pattern.compare(view[:nbytes], off) >= 0:
+                    raise IOError(f"data mismatch at offset {off}")
+            else:
+                # re-write the very same data, so the file stays verifiable
+                pattern.fill(view, off)
+                start = time.perf_counter()
+                nbytes = os.pwritev(fd, [buf], off)
+                hist.record(time.perf_counter() - start)
+            if nbytes != _block_size:
+                raise IOError(f"short {workload}: {nbytes} at offset {off}")
+    return hist
+
+
+def _run_iops(
+    fd: int, pattern: testhelper.DataPattern, workload: str, qdepth: int
+) -> testhelper.LatencyHistogram:
+    deadline = time.monotonic() + _duration
+    seeds = [random.getrandbits(64) for _ in range(qdepth)]
+    hist = testhelper.LatencyHistogram()
+    with concurrent.futures.ThreadPoolExecutor(qdepth) as executor:
+        futures = [
+            executor.submit(
+                _iops_worker, fd, pattern, workload, deadline, seed
+            )
+            for seed in seeds
+        ]
+        for future in futures:
+            hist.merge(future.result())
+    return hist
+
+
+def _run_iops_checks(base: Path) -> None:
+    base.mkdir(exist_ok=True)
+    path = base / "iops-file"
+    pattern = testhelper.make_data_pattern()
+    fd, direct = _open_file(path)
+    try:
+        _prealloc_file(fd, pattern)
+        print(f"\nblock_size={_block_size} direct={direct}")
+        for workload in _workloads:
+            base_p99 = 0.0
+            knee = None
+            for qdepth in _queue_depths:
+                summary = _run_iops(fd, pattern, workload, qdepth).summary()
+                base_p99 = base_p99 or summary["p99"]
+                if knee is None and summary["p99"] > _knee_factor * base_p99:
+                    knee = qdepth
+                print(
+                    f"{workload} qd={qdepth} "
+                    f"iops={summary['count'] / _duration:.0f} "
+                    f"p50={summary['p50'] * 1000:.3f}ms "
+                    f"p99={summary['p99'] * 1000:.3f}ms "
+                    f"p99.9={summary['p99.9'] * 1000:.3f}ms "
+                    f"max={summary['max'] * 1000:.3f}ms"
+                )
+            print(f"{workload} latency knee at qd={knee}")
+    finally:
+        os.close(fd)
+        shutil.rmtree(base, ignore_errors=True)
+
+
+@pytest.mark.benchmark
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_random_iops(setup_mount: Path) -> None:
+    base = setup_mount / "iops-test"
+    _run_iops_checks(base)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_random_iops_premounted(test_dir: Path) -> None:
+    base = test_dir / "iops-test"
+    _run_iops_checks(base)
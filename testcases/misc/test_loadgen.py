@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Open-loop load generator: operations are issued via SMB mount-point at a
+# target rate, on a timeline which does not depend on how fast previous
+# operations complete. Latency is measured from each operation's intended
+# start time, so that queueing delay is accounted for once the share falls
+# behind. The rate is ramped stepwise to find the share's saturation point.
+
+import pytest
+import concurrent.futures
+import os
+import random
+import shutil
+import threading
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import test_info, gen_params, gen_params_premounted
+
+# Maximal number of issued yet uncompleted operations per worker, beyond
+# which a step is stopped as overloaded.
+_max_backlog_per_worker = 16
+# Achieved rate, relative to target rate, below which a step is saturated
+_min_rate_ratio = 0.9
+# p99 latency growth, relative to first step, which marks saturation
+_knee_factor = 4.0
+
+
+class _LoadFiles:
+    """Set of files which load operations read or re-write.
+
+    Each file holds its own data pattern. Writes store the very same
+    bytes again, so that any read, concurrent with writes or not, can be
+    verified.
+    """
+
+    def __init__(self, base: Path, nfiles: int, file_size: int) -> None:
+        self.base = base
+        self.file_size = file_size
+        self.patterns = [testhelper.make_data_pattern() for _ in range(nfiles)]
+        for idx in range(nfiles):
+            self.write(idx)
+
+    def _path(self, idx: int) -> Path:
+        return self.base / f"loadfile-{idx}"
+
+    def write(self, idx: int) -> None:
+        # over-write in place; truncation would expose short file to readers
+        fd = os.open(self._path(idx), os.O_CREAT | os.O_WRONLY, 0o644)
+        try:
+            pos = 0
+            for chunk in self.patterns[idx].chunks(0, self.file_size):
+                pos += os.pwrite(fd, chunk, pos)
+        finally:
+            os.close(fd)
+
+    def read(self, idx: int) -> None:
+        data = self._path(idx).read_bytes()
+        if len(data) != self.file_size:
+            raise IOError(f"size mismatch: {len(data)} {self._path(idx)}")
+        if self.patterns[idx].compare(data, 0) >= 0:
+            raise IOError(f"data mismatch: {self._path(idx)}")
+
+
+class _StepStats:
+    """Results of a single constant-rate step"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # from intended start time, and from actual start time
+        self.latency = testhelper.LatencyHistogram()
+        self.service = testhelper.LatencyHistogram()
+        self.issued = 0
+        self.completed = 0
+        self.errors: typing.List[str] = []
+        self.overloaded = False
+
+    def done(
+        self, intended: float, start: float, error: typing.Optional[str]
+    ) -> None:
+        end = time.perf_counter()
+        with self.lock:
+            self.latency.record(end - intended)
+            self.service.record(end - start)
+            self.completed += 1
+            if error is not None:
+                self.errors.append(error)
+
+    def backlog(self) -> int:
+        with self.lock:
+            return self.issued - self.completed
+
+
+def _do_op(
+    files: _LoadFiles,
+    stats: _StepStats,
+    intended: float,
+    is_read: bool,
+    idx: int,
+) -> None:
+    start = time.perf_counter()
+    error = None
+    try:
+        if is_read:
+            files.read(idx)
+        else:
+            files.write(idx)
+    except Exception as ex:
+        error = f"{type(ex).__name__}: {ex}"
+    stats.done(intended, start, error)
+
+
+def _run_step(
+    executor: concurrent.futures.Executor,
+    files: _LoadFiles,
+    config: testhelper.LoadgenConfig,
+    rate: float,
+    rnd: random.Random,
+) -> typing.Tuple[_StepStats, float]:
+    stats = _StepStats()
+    nfiles = len(files.patterns)
+    max_backlog = _max_backlog_per_worker * config.workers
+    begin = time.perf_counter()
+    for seq in range(int(rate * config.step_duration)):
+        intended = begin + seq / rate
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if stats.backlog() > max_backlog:
+            stats.overloaded = True
+            break
+        is_read = rnd.random() < config.read_ratio
+        idx = rnd.randrange(nfiles)
+        with stats.lock:
+            stats.issued += 1
+        executor.submit(_do_op, files, stats, intended, is_read, idx)
+    # wait for completion of all operations issued within this step
+    while stats.backlog() > 0:
+        time.sleep(0.01)
+    return (stats, time.perf_counter() - begin)
+
+
+def _run_load(base: Path, config: testhelper.LoadgenConfig) -> None:
+    seed = random.getrandbits(32)
+    rnd = random.Random(seed)
+    print(f"\nseed={seed} duration={config.step_duration}s per rate")
+    files = _LoadFiles(base, config.nfiles, config.file_size)
+    base_p99 = 0.0
+    saturation = None
+    with concurrent.futures.ThreadPoolExecutor(config.workers) as executor:
+        for rate in config.rates:
+            stats, elapsed = _run_step(executor, files, config, rate, rnd)
+            if stats.errors:
+                pytest.fail(f"rate={rate}: {stats.errors[0]}")
+            achieved = stats.completed / elapsed
+            latency = stats.latency.summary()
+            service = stats.service.summary()
+            base_p99 = base_p99 or latency["p99"]
+            if saturation is None and (
+                stats.overloaded
+                or achieved < _min_rate_ratio * rate
+                or latency["p99"] > _knee_factor * base_p99
+            ):
+                saturation = rate
+            print(
+                f"rate={rate:.0f} achieved={achieved:.1f}ops/s "
+                f"p50={latency['p50'] * 1000:.3f}ms "
+                f"p99={latency['p99'] * 1000:.3f}ms "
+                f"max={latency['max'] * 1000:.3f}ms "
+                f"service_p99={service['p99'] * 1000:.3f}ms"
+                + (" overloaded" if stats.overloaded else "")
+            )
+    print(f"saturation at rate={saturation}")
+
+
+def _run_loadgen(directory: Path) -> None:
+    directory.mkdir(exist_ok=True)
+    try:
+        _run_load(directory, test_info.loadgen)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.mark.benchmark
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_open_loop_load(setup_mount: Path) -> None:
+    base = setup_mount / "loadgen-test"
+    _run_loadgen(base)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_open_loop_load_premounted(test_dir: Path) -> None:
+    base = test_dir / "loadgen-test"
+    _run_loadgen(base)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+# Metadata-heavy workload via SMB mount-point: many concurrent clients run
+# a weighted mix of create, stat, readdir, rename, setattr and unlink
+# operations over files within a few large shared directories. Each client
+# draws its operations from its own seeded random stream, so that a run
+# is reproducible given the seed.
+
+import pytest
+import concurrent.futures
+import os
+import random
+import shutil
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import test_info, gen_params, gen_params_premounted
+
+# Operations which need an existing file; done as create if there is none
+_file_ops = ["stat", "rename", "setattr", "unlink"]
+
+
+class _MetaClient:
+    """A client performing a random mix of metadata operations.
+
+    Each client tracks the files it owns, and their expected size and
+    modification time, so that every operation has a well-defined outcome
+    regardless of the operations of other clients in the same directories.
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        dirs: typing.List[Path],
+        ops: typing.Dict[str, int],
+        seed: int,
+    ) -> None:
+        self.client_id = client_id
+        self.dirs = dirs
+        self.ops = list(ops.keys())
+        self.weights = list(ops.values())
+        self.rnd = random.Random(seed)
+        self.seq = 0
+        self.files: typing.List[Path] = []
+        self.attrs: typing.Dict[Path, typing.Tuple[int, int]] = {}
+        self.latency = {
+            op: testhelper.LatencyHistogram() for op in testhelper.METADATA_OPS
+        }
+
+    def _new_path(self) -> Path:
+        self.seq += 1
+        return self.rnd.choice(self.dirs) / f"c{self.client_id}-{self.seq}"
+
+    def _pick(self) -> int:
+        return self.rnd.randrange(len(self.files))
+
+    def _drop(self, idx: int) -> Path:
+        path = self.files[idx]
+        self.files[idx] = self.files[-1]
+        self.files.pop()
+        return path
+
+    def _create(self) -> None:
+        path = self._new_path()
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        os.close(fd)
+        self.files.append(path)
+        self.attrs[path] = (0, -1)
+
+    def _stat(self) -> None:
+        path = self.files[self._pick()]
+        st = os.stat(path)
+        size, mtime = self.attrs[path]
+        if st.st_size != size:
+            raise IOError(f"size mismatch: {st.st_size} != {size} {path}")
+        if mtime >= 0 and int(st.st_mtime) != mtime:
+            raise IOError(f"mtime mismatch: {st.st_mtime} != {mtime} {path}")
+
+    def _readdir(self) -> None:
+        dirpath = self.rnd.choice(self.dirs)
+        names = set(os.listdir(dirpath))
+        for path in self.files:
+            if path.parent == dirpath and path.name not in names:
+                raise IOError(f"missing directory entry: {path}")
+
+    def _rename(self) -> None:
+        path = self._drop(self._pick())
+        newpath = self._new_path()
+        os.rename(path, newpath)
+        self.files.append(newpath)
+        self.attrs[newpath] = self.attrs.pop(path)
+
+    def _setattr(self) -> None:
+        path = self.files[self._pick()]
+        size = self.rnd.randrange(2**16)
+        mtime = self.rnd.randrange(10**9, 2 * 10**9)
+        os.truncate(path, size)
+        os.utime(path, (mtime, mtime))
+        self.attrs[path] = (size, mtime)
+
+    def _unlink(self) -> None:
+        path = self._drop(self._pick())
+        os.unlink(path)
+        del self.attrs[path]
+
+    def run(self, nops: int) -> "_MetaClient":
+        for _ in range(nops):
+            op = self.rnd.choices(self.ops, self.weights)[0]
+            if op in _file_ops and not self.files:
+                op = "create"
+            start = time.perf_counter()
+            getattr(self, f"_{op}")()
+            self.latency[op].record(time.perf_counter() - start)
+        return self
+
+
+def _verify_dirs(
+    dirs: typing.List[Path], clients: typing.List[_MetaClient]
+) -> None:
+    for dirpath in dirs:
+        expected = {
+            path.name
+            for client in clients
+            for path in client.files
+            if path.parent == dirpath
+        }
+        names = set(os.listdir(dirpath))
+        if names != expected:
+            raise IOError(
+                f"entries mismatch at {dirpath}: "
+                f"missing={sorted(expected - names)[:8]} "
+                f"unexpected={sorted(names - expected)[:8]}"
+            )
+
+
+def _run_metadata_workload(
+    base: Path, config: testhelper.MetadataConfig
+) -> typing.Dict[str, typing.Any]:
+    seed = config.seed
+    if seed is None:
+        seed = random.getrandbits(32)
+    print(f"\nseed={seed} clients={config.clients} nops={config.nops}")
+    dirs = [base / f"dir{idx}" for idx in range(config.ndirs)]
+    for dirpath in dirs:
+        dirpath.mkdir()
+    clients = [
+        _MetaClient(cid, dirs, config.ops, seed + cid)
+        for cid in range(config.clients)
+    ]
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(config.clients) as executor:
+        futures = [
+            executor.submit(client.run, config.nops) for client in clients
+        ]
+    elapsed = max(time.monotonic() - start, 1e-9)
+    errors = [
+        f"Client {cid}: {type(ex).__name__}: {ex}"
+        for cid, ex in enumerate(future.exception() for future in futures)
+        if ex is not None
+    ]
+    if errors:
+        pytest.fail("\n".join(errors))
+    _verify_dirs(dirs, clients)
+
+    latency = {}
+    for op in testhelper.METADATA_OPS:
+        hist = testhelper.LatencyHistogram()
+        for client in clients:
+            hist.merge(client.latency[op])
+        latency[op] = hist.summary()
+        print(
+            f"{op}: count={hist.count} "
+            f"p50={latency[op]['p50'] * 1000:.3f}ms "
+            f"p99={latency[op]['p99'] * 1000:.3f}ms "
+            f"max={latency[op]['max'] * 1000:.3f}ms"
+        )
+    nops = sum(lat["count"] for lat in latency.values())
+    print(f"total: {nops} ops in {elapsed:.1f}s, {nops / elapsed:.1f}ops/s")
+    return {
+        "seed": seed,
+        "clients": config.clients,
+        "ndirs": config.ndirs,
+        "mix": config.ops,
+        "elapsed": elapsed,
+        "ops_per_sec": nops / elapsed,
+        "latency": latency,
+    }
+
+
+def _run_metadata_tests(directory: Path, share: testhelper.Share) -> None:
+    directory.mkdir(exist_ok=True)
+    try:
+        report = _run_metadata_workload(directory, test_info.metadata)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    report["share"] = share.name
+    path = testhelper.write_report(f"metadata-{share.name}", report)
+    print(f"Report: {path}")
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_metadata_mix(setup_mount: Path, share: testhelper.Share) -> None:
+    base = setup_mount / "metadata-test"
+    _run_metadata_tests(base, share)
+
+
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_metadata_mix_premounted(
+    test_dir: Path, share: testhelper.Share
+) -> None:
+    base = test_dir / "metadata-test"
+    _run_metadata_tests(base, share)
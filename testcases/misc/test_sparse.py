@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+# Test integrity of large sparse files via SMB mount-point: data is written
+# at scattered offsets beyond 4G, and the file is then truncated, extended,
+# preallocated and hole-punched. File contents are verified after each step
+# by regenerating expected data per offset, without materializing the file.
+
+import pytest
+import errno
+import os
+import shutil
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import gen_params, gen_params_premounted
+
+_GiB = 2**30
+_zero_window = 4096
+_unsupported_errnos = (errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL)
+
+
+class SparseFile:
+    """A sparse file whose expected content is tracked as data extents.
+
+    Byte at offset X of the file is either byte X of the data-pattern
+    stream, if X is within one of the extents, or zero otherwise.
+    """
+
+    CHUNK_SIZE = 2**20
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.pattern = testhelper.make_data_pattern()
+        self.extents: typing.List[typing.Tuple[int, int]] = []
+        self.size = 0
+        self.fd = os.open(path, os.O_CREAT | os.O_TRUNC | os.O_RDWR, 0o600)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def _carve(self, start: int, end: int) -> None:
+        extents = []
+        for off, cnt in self.extents:
+            if off < start:
+                extents.append((off, min(off + cnt, start) - off))
+            if off + cnt > end:
+                beg = max(off, end)
+                extents.append((beg, off + cnt - beg))
+        self.extents = extents
+
+    def pwrite(self, offset: int, length: int) -> None:
+        pos = offset
+        for chunk in self.pattern.chunks(offset, length, self.CHUNK_SIZE):
+            nbytes = os.pwrite(self.fd, chunk, pos)
+            if nbytes != len(chunk):
+                raise IOError(f"short write: {nbytes} at {pos} {self.path}")
+            pos += nbytes
+        self._carve(offset, offset + length)
+        self.extents = sorted(self.extents + [(offset, length)])
+        self.size = max(self.size, offset + length)
+
+    def truncate(self, size: int) -> None:
+        os.ftruncate(self.fd, size)
+        self._carve(size, max(self.size, size))
+        self.size = size
+
+    def fallocate(self, offset: int, length: int) -> None:
+        os.posix_fallocate(self.fd, offset, length)
+        self.size = max(self.size, offset + length)
+
+    def punch_hole(self, offset: int, length: int) -> None:
+        testhelper.punch_hole(self.fd, offset, length)
+        self._carve(offset, offset + length)
+
+    def _holes(self) -> typing.Iterator[typing.Tuple[int, int]]:
+        pos = 0
+        for off, cnt in self.extents + [(self.size, 0)]:
+            if off > pos:
+                yield (pos, off - pos)
+            pos = off + cnt
+
+    def _pread(self, offset: int, length: int) -> bytes:
+        data = os.pread(self.fd, length, offset)
+        if len(data) != length:
+            raise IOError(f"short read: {len(data)} at {offset} {self.path}")
+        return data
+
+    def _verify_extent(self, offset: int, length: int) -> None:
+        pos = offset
+        while pos < offset + length:
+            cnt = min(self.CHUNK_SIZE, offset + length - pos)
+            mismatch = self.pattern.find_mismatch(self._pread(pos, cnt), pos)
+            if mismatch is not None:
+                raise IOError(
+                    f"data mismatch at {self.path}: "
+                    f"offset={pos + mismatch[0]} length={mismatch[1]}"
+                )
+            pos += cnt
+
+    def _verify_hole(self, offset: int, length: int) -> None:
+        # sample head, middle and tail of the hole
+        end = offset + length
+        mid = offset + length // 2
+        for pos in (offset, mid, max(end - _zero_window, offset)):
+            cnt = min(_zero_window, end - pos)
+            if self._pread(pos, cnt).count(0) != cnt:
+                raise IOError(f"non-zero data in hole at {self.path}:{pos}")
+
+    def verify(self) -> None:
+        st = os.fstat(self.fd)
+        if st.st_size != self.size:
+            raise IOError(
+                f"stat size mismatch: {st.st_size} != {self.size} {self.path}"
+            )
+        for offset, length in self.extents:
+            self._verify_extent(offset, length)
+        for offset, length in self._holes():
+            self._verify_hole(offset, length)
+        if os.pread(self.fd, 1, self.size):
+            raise IOError(f"data beyond end-of-file {self.path}")
+        print(
+            f"size={st.st_size} allocated={st.st_blocks * 512} "
+            f"extents={len(self.extents)}"
+        )
+
+
+def _try_unsupported(
+    name: str, fn: typing.Callable[[int, int], None], offset: int, cnt: int
+) -> None:
+    try:
+        fn(offset, cnt)
+    except OSError as ex:
+        if ex.errno not in _unsupported_errnos:
+            raise
+        print(f"{name} not supported: {ex}")
+
+
+def _check_sparse_file(path: Path) -> None:
+    sfile = SparseFile(path)
+    try:
+        # scattered writes, one of which straddles the 4G boundary
+        for offset, length in [
+            (0, 65536),
+            (2**32 - 6000, 12000),
+            (5 * _GiB + 12345, 2**20 + 7),
+            (6 * _GiB, 4096),
+            (8 * _GiB + 3 * 4096, 2**18),
+        ]:
+            sfile.pwrite(offset, length)
+        sfile.verify()
+        # punch a hole within data and one across a data boundary
+        _try_unsupported(
+            "punch-hole", sfile.punch_hole, 5 * _GiB + 2**19, 2**16
+        )
+        _try_unsupported("punch-hole", sfile.punch_hole, 6 * _GiB - 4096, 8192)
+        sfile.verify()
+        # shrink into the last data extent, then extend beyond it
+        sfile.truncate(8 * _GiB + 3 * 4096 + 100000)
+        sfile.verify()
+        sfile.truncate(9 * _GiB)
+        sfile.verify()
+        # preallocate across end-of-file, then overwrite within
+        _try_unsupported("fallocate", sfile.fallocate, 9 * _GiB - 2**20, 2**21)
+        sfile.verify()
+        sfile.pwrite(9 * _GiB - 2**19, 2**16 + 1)
+        sfile.verify()
+    finally:
+        sfile.close()
+
+
+def _run_sparse_checks(base: Path) -> None:
+    base.mkdir(exist_ok=True)
+    try:
+        _check_sparse_file(base / "sparse-file")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_sparse_file(setup_mount: Path) -> None:
+    base = setup_mount / "sparse-test"
+    _run_sparse_checks(base)
+
+
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_sparse_file_premounted(test_dir: Path) -> None:
+    base = test_dir / "sparse-test"
+    _run_sparse_checks(base)
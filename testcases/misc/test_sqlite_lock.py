@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# Test concurrent access to a single SQLite database via SMB mount-points,
+# from several processes and optionally via several mounts (and nodes).
+# Writers run transfer transactions between accounts while readers verify
+# that the sum of balances never changes. As the number of writers grows,
+# transactions per second and the latency of acquiring the database's
+# write lock (byte-range locks on the server) are reported. Integrity of
+# the database is verified after each step.
+
+import pytest
+import concurrent.futures
+import random
+import shutil
+import sqlite3
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import gen_params, gen_params_multi, gen_params_premounted
+
+_writer_counts = [1, 2, 4, 8]
+_num_readers = 2
+_num_accounts = 100
+_initial_balance = 1000
+_duration = 10.0
+_busy_timeout = 30.0
+
+
+class _ClientResult:
+    """Counters and latencies of a single reader or writer process"""
+
+    def __init__(self) -> None:
+        self.txs = 0
+        self.busy = 0
+        self.lock_wait = testhelper.LatencyHistogram()
+        self.latency = testhelper.LatencyHistogram()
+
+    def merge(self, other: "_ClientResult") -> None:
+        self.txs += other.txs
+        self.busy += other.busy
+        self.lock_wait.merge(other.lock_wait)
+        self.latency.merge(other.latency)
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # rollback journal: WAL requires shared memory, which remote clients
+    # of the same database can not have
+    conn = sqlite3.connect(
+        str(path), timeout=_busy_timeout, isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=DELETE")
+    return conn
+
+
+def _is_busy(ex: sqlite3.OperationalError) -> bool:
+    return "locked" in str(ex) or "busy" in str(ex)
+
+
+def _rollback(conn: sqlite3.Connection) -> None:
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+
+
+def _writer(path: Path, client_id: int, seed: int) -> _ClientResult:
+    res = _ClientResult()
+    rnd = random.Random(seed)
+    conn = _connect(path)
+    try:
+        end = time.monotonic() + _duration
+        while time.monotonic() < end:
+            src, dst = rnd.sample(range(_num_accounts), 2)
+            amount = rnd.randrange(1, 100)
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                res.lock_wait.record(time.perf_counter() - start)
+                conn.execute(
+                    "UPDATE accounts SET balance = balance - ? WHERE id = ?",
+                    (amount, src),
+                )
+                conn.execute(
+                    "UPDATE accounts SET balance = balance + ? WHERE id = ?",
+                    (amount, dst),
+                )
+                conn.execute(
+                    "INSERT INTO transfers (client, amount) VALUES (?, ?)",
+                    (client_id, amount),
+                )
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError as ex:
+                if not _is_busy(ex):
+                    raise
+                _rollback(conn)
+                res.busy += 1
+                continue
+            res.latency.record(time.perf_counter() - start)
+            res.txs += 1
+    finally:
+        conn.close()
+    return res
+
+
+def _reader(path: Path, client_id: int, seed: int) -> _ClientResult:
+    res = _ClientResult()
+    expected = (_num_accounts * _initial_balance, _num_accounts)
+    conn = _connect(path)
+    try:
+        end = time.monotonic() + _duration
+        while time.monotonic() < end:
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN")
+                row = conn.execute(
+                    "SELECT SUM(balance), COUNT(*) FROM accounts"
+                ).fetchone()
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError as ex:
+                if not _is_busy(ex):
+                    raise
+                _rollback(conn)
+                res.busy += 1
+                continue
+            if tuple(row) != expected:
+                raise ValueError(f"inconsistent read: {row} != {expected}")
+            res.latency.record(time.perf_counter() - start)
+            res.txs += 1
+    finally:
+        conn.close()
+    return res
+
+
+def _create_db(path: Path) -> None:
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute(
+            "CREATE TABLE accounts (id INTEGER PRIMARY KEY, balance INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE transfers (id INTEGER PRIMARY KEY, "
+            "client INTEGER, amount INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO accounts VALUES (?, ?)",
+            [(idx, _initial_balance) for idx in range(_num_accounts)],
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _verify_db(path: Path, transfers: int) -> None:
+    conn = _connect(path)
+    try:
+        res = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if res != "ok":
+            raise ValueError(f"integrity check failed: {res}")
+        total = conn.execute("SELECT SUM(balance) FROM accounts").fetchone()
+        if total[0] != _num_accounts * _initial_balance:
+            raise ValueError(f"balance mismatch: {total[0]}")
+        count = conn.execute("SELECT COUNT(*) FROM transfers").fetchone()
+        if count[0] != transfers:
+            raise ValueError(f"transfers mismatch: {count[0]} {transfers}")
+    finally:
+        conn.close()
+
+
+def _run_step(
+    paths: typing.List[Path], nwriters: int
+) -> typing.Tuple[_ClientResult, _ClientResult]:
+    """Run writers and readers concurrently, each process accessing the
+    database via one of paths (round-robin)"""
+    roles = [_writer] * nwriters + [_reader] * _num_readers
+    writes = _ClientResult()
+    reads = _ClientResult()
+    with concurrent.futures.ProcessPoolExecutor(len(roles)) as executor:
+        futures = [
+            executor.submit(
+                role, paths[cid % len(paths)], cid, random.getrandbits(64)
+            )
+            for cid, role in enumerate(roles)
+        ]
+        for cid, future in enumerate(futures):
+            try:
+                res = future.result()
+            except Exception as ex:
+                pytest.fail(f"Client {cid}: {type(ex).__name__}: {ex}")
+            (writes if cid < nwriters else reads).merge(res)
+    return (writes, reads)
+
+
+def _wait_visible(paths: typing.List[Path], timeout: float = 10.0) -> None:
+    # other mounts may cache the (non-)existence of entries for a while
+    end = time.monotonic() + timeout
+    for path in paths:
+        while not path.exists():
+            if time.monotonic() > end:
+                raise IOError(f"not visible: {path}")
+            time.sleep(0.1)
+
+
+def _check_sqlite_contention(
+    paths: typing.List[Path],
+) -> typing.Dict[str, typing.Any]:
+    _create_db(paths[0])
+    _wait_visible(paths)
+    transfers = 0
+    steps = []
+    for nwriters in _writer_counts:
+        writes, reads = _run_step(paths, nwriters)
+        transfers += writes.txs
+        _verify_db(paths[0], transfers)
+        lock_wait = writes.lock_wait.summary()
+        step = {
+            "writers": nwriters,
+            "readers": _num_readers,
+            "write_tx_per_sec": writes.txs / _duration,
+            "read_tx_per_sec": reads.txs / _duration,
+            "busy": writes.busy + reads.busy,
+            "lock_wait": lock_wait,
+            "write_latency": writes.latency.summary(),
+            "read_latency": reads.latency.summary(),
+        }
+        steps.append(step)
+        print(
+            f"writers={nwriters} readers={_num_readers} "
+            f"write_tx/s={step['write_tx_per_sec']:.1f} "
+            f"read_tx/s={step['read_tx_per_sec']:.1f} "
+            f"busy={step['busy']} "
+            f"lock_wait_p50={lock_wait['p50'] * 1000:.3f}ms "
+            f"lock_wait_p99={lock_wait['p99'] * 1000:.3f}ms "
+            f"lock_wait_max={lock_wait['max'] * 1000:.3f}ms"
+        )
+    return {"mounts": len(paths), "steps": steps}
+
+
+def _run_sqlite_contention_checks(
+    directories: typing.List[Path], share: testhelper.Share
+) -> None:
+    """Run contention checks on a database within directories[0], which
+    is also accessed via each of the other directories (all of which are
+    views of the very same directory via distinct mounts)."""
+    print()
+    directories[0].mkdir(exist_ok=True)
+    try:
+        report = _check_sqlite_contention(
+            [directory / "db.sqlite" for directory in directories]
+        )
+    finally:
+        shutil.rmtree(directories[0], ignore_errors=True)
+    report["share"] = share.name
+    path = testhelper.write_report(
+        f"sqlite-lock-{share.name}-mounts{report['mounts']}", report
+    )
+    print(f"Report: {path}")
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_sqlite_contention(setup_mount: Path, share: testhelper.Share) -> None:
+    base = setup_mount / "sqlite-lock"
+    _run_sqlite_contention_checks([base], share)
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mounts", gen_params_multi(), indirect=True)
+def test_sqlite_contention_multi(
+    setup_mounts: typing.List[typing.Tuple[str, Path]],
+    share: testhelper.Share,
+) -> None:
+    # the private directory of first mount, as seen via each of the mounts
+    name = setup_mounts[0][1].name
+    bases = [
+        test_dir.parent / name / "sqlite-lock" for _, test_dir in setup_mounts
+    ]
+    _run_sqlite_contention_checks(bases, share)
+
+
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_sqlite_contention_premounted(
+    test_dir: Path, share: testhelper.Share
+) -> None:
+    base = test_dir / "sqlite-lock"
+    _run_sqlite_contention_checks([base], share)
@@ -1,69 +1,283 @@
 import pytest
-import threading
+import concurrent.futures
+import os
+import random
+import time
+import typing
 import testhelper
 import shutil
 from pathlib import Path
-from .conftest import gen_params, gen_params_premounted
+from .conftest import (
+    test_info,
+    gen_params,
+    gen_params_multi,
+    gen_params_premounted,
+)
 
+# Clients stream data in chunks of _chunk_size, so that memory used by each
+# client is a few chunks regardless of file size.
+_num_operations = 40
+_file_size = 2**25
+_chunk_size = 2**20
+_ops = ["open", "write", "read", "close", "unlink"]
+# (client id, error) of each failed client
+_ClientErrors = typing.List[typing.Tuple[int, str]]
 
-def _perform_file_operations(
-    client_id: int, root_dir: Path, num_operations: int, file_size: int
+
+class _ClientStats:
+    """Latency histogram per operation type, and number of bytes moved"""
+
+    def __init__(self) -> None:
+        self.latency = {op: testhelper.LatencyHistogram() for op in _ops}
+        self.nbytes = 0
+
+    def record(self, op: str, start: float) -> None:
+        self.latency[op].record(time.perf_counter() - start)
+
+    def merge(self, other: "_ClientStats") -> None:
+        for op in _ops:
+            self.latency[op].merge(other.latency[op])
+        self.nbytes += other.nbytes
+
+
+def _open_file(path: Path, flags: int, stats: _ClientStats) -> int:
+    start = time.perf_counter()
+    fd = os.open(path, flags, 0o644)
+    stats.record("open", start)
+    return fd
+
+
+def _close_file(fd: int, stats: _ClientStats) -> None:
+    start = time.perf_counter()
+    os.close(fd)
+    stats.record("close", start)
+
+
+def _write_file(
+    path: Path,
+    pattern: testhelper.DataPattern,
+    file_size: int,
+    stats: _ClientStats,
 ) -> None:
+    fd = _open_file(path, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, stats)
     try:
-        for i in range(num_operations):
-            file_content = testhelper.generate_random_bytes(file_size)
-            path = root_dir / f"testfile_{client_id}_{i}.txt"
-            path.write_bytes(file_content)
-            file_content_out = path.read_bytes()
+        for chunk in pattern.chunks(0, file_size, _chunk_size):
+            start = time.perf_counter()
+            nbytes = os.write(fd, chunk)
+            stats.record("write", start)
+            if nbytes != len(chunk):
+                raise IOError(f"short write: {nbytes} != {len(chunk)}")
+            stats.nbytes += nbytes
+    finally:
+        _close_file(fd, stats)
+
 
-            if file_content_out != file_content:
-                raise IOError("content mismatch")
+def _verify_file(
+    path: Path,
+    pattern: testhelper.DataPattern,
+    file_size: int,
+    buf: memoryview,
+    stats: _ClientStats,
+) -> None:
+    pos = 0
+    fd = _open_file(path, os.O_RDONLY, stats)
+    try:
+        while True:
+            start = time.perf_counter()
+            nbytes = os.readv(fd, [buf])
+            stats.record("read", start)
+            if not nbytes:
+                break
+            idx = pattern.compare(buf[:nbytes], pos, _chunk_size)
+            if idx >= 0:
+                raise IOError(f"content mismatch at offset {pos + idx}")
+            pos += nbytes
+            stats.nbytes += nbytes
+    finally:
+        _close_file(fd, stats)
+    if pos != file_size:
+        raise IOError(f"size mismatch: {pos} != {file_size}")
 
-            path.unlink()
-    except Exception as ex:
-        print(f"Error while stress testing with Client {client_id}: %s", ex)
-        raise
 
+def _perform_file_operations(
+    client_id: int, root_dir: Path, num_operations: int, file_size: int
+) -> _ClientStats:
+    stats = _ClientStats()
+    buf = memoryview(bytearray(_chunk_size))
+    for i in range(num_operations):
+        pattern = testhelper.make_data_pattern()
+        path = root_dir / f"testfile_{client_id}_{i}.txt"
+        _write_file(path, pattern, file_size, stats)
+        _verify_file(path, pattern, file_size, buf, stats)
+        start = time.perf_counter()
+        path.unlink()
+        stats.record("unlink", start)
+    return stats
 
-def _stress_test(
-    root_dir: Path, num_clients: int, num_operations: int, file_size: int
-) -> None:
-    threads = []
 
-    for i in range(num_clients):
-        thread = threading.Thread(
-            target=_perform_file_operations,
-            args=(i, root_dir, num_operations, file_size),
-        )
-        threads.append(thread)
+def _run_clients(
+    root_dirs: typing.List[Path],
+    client_ids: typing.List[int],
+    num_operations: int,
+    file_size: int,
+) -> typing.Tuple[_ClientStats, _ClientErrors]:
+    with concurrent.futures.ThreadPoolExecutor(len(client_ids)) as executor:
+        futures = {
+            cid: executor.submit(
+                _perform_file_operations,
+                cid,
+                root_dirs[cid % len(root_dirs)],
+                num_operations,
+                file_size,
+            )
+            for cid in client_ids
+        }
+    stats = _ClientStats()
+    errors = []
+    for cid, future in futures.items():
+        ex = future.exception()
+        if ex is not None:
+            errors.append((cid, f"{type(ex).__name__}: {ex}"))
+        else:
+            stats.merge(future.result())
+    return (stats, errors)
 
-    for thread in threads:
-        thread.start()
 
-    for thread in threads:
-        thread.join()
+def _stress_test(
+    root_dirs: typing.List[Path],
+    num_procs: int,
+    num_threads: int,
+    num_operations: int,
+    file_size: int,
+) -> typing.Dict[str, typing.Any]:
+    """Run num_threads stress clients within each of num_procs processes.
 
-    print("Stress test complete.")
+    When num_procs is zero, all clients are threads of the test process.
+    Clients are spread round-robin across root_dirs, which may reside on
+    distinct mounts. Errors of all clients are collected and reported as a
+    test failure. Returns a report of aggregate throughput and
+    per-operation latencies.
+    """
+    groups = [
+        list(range(idx * num_threads, (idx + 1) * num_threads))
+        for idx in range(max(num_procs, 1))
+    ]
+    stats = _ClientStats()
+    errors: _ClientErrors = []
+    start = time.monotonic()
+    if num_procs == 0:
+        stats, errors = _run_clients(
+            root_dirs, groups[0], num_operations, file_size
+        )
+    else:
+        # re-seed workers so that forked processes do not share state
+        with concurrent.futures.ProcessPoolExecutor(
+            num_procs, initializer=random.seed
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_clients,
+                    root_dirs,
+                    ids,
+                    num_operations,
+                    file_size,
+                )
+                for ids in groups
+            ]
+            for future in futures:
+                group_stats, group_errors = future.result()
+                stats.merge(group_stats)
+                errors.extend(group_errors)
+    elapsed = max(time.monotonic() - start, 1e-9)
+    if errors:
+        pytest.fail(
+            "\n".join(f"Client {cid}: {err}" for cid, err in sorted(errors))
+        )
+    nops = sum(hist.count for hist in stats.latency.values())
+    latency = {op: stats.latency[op].summary() for op in _ops}
+    report = {
+        "processes": num_procs,
+        "threads": num_threads,
+        "clients": sum(len(ids) for ids in groups),
+        "operations": num_operations,
+        "file_size": file_size,
+        "elapsed": elapsed,
+        "bytes": stats.nbytes,
+        "mb_per_sec": stats.nbytes / elapsed / 2**20,
+        "ops_per_sec": nops / elapsed,
+        "latency": latency,
+    }
+    print(
+        f"Stress test complete: {report['mb_per_sec']:.1f}MB/s "
+        f"{report['ops_per_sec']:.1f}ops/s"
+    )
+    for op, lat in latency.items():
+        print(
+            f"{op}: count={lat['count']} "
+            f"p50={lat['p50'] * 1000:.3f}ms "
+            f"p90={lat['p90'] * 1000:.3f}ms "
+            f"p99={lat['p99'] * 1000:.3f}ms "
+            f"max={lat['max'] * 1000:.3f}ms"
+        )
+    return report
 
 
-def _run_stress_tests(directory: Path) -> None:
-    directory.mkdir(exist_ok=True)
+def _run_stress_tests(
+    directories: typing.List[Path],
+    share: testhelper.Share,
+    nodes: int = 1,
+) -> None:
+    config = test_info.stress
+    for directory in directories:
+        directory.mkdir(exist_ok=True)
     try:
-        _stress_test(
-            directory, num_clients=20, num_operations=40, file_size=2**25
+        report = _stress_test(
+            directories,
+            num_procs=config.processes,
+            num_threads=config.threads,
+            num_operations=_num_operations,
+            file_size=_file_size,
         )
     finally:
-        shutil.rmtree(directory, ignore_errors=True)
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+    mounts = len(directories)
+    report.update(share=share.name, mounts=mounts, nodes=nodes)
+    print(
+        f"mounts={mounts} nodes={nodes} "
+        f"throughput={report['mb_per_sec']:.1f}MB/s"
+    )
+    path = testhelper.write_report(
+        f"stress-{share.name}-{config.processes}x{config.threads}"
+        f"-mounts{mounts}",
+        report,
+    )
+    print(f"Report: {path}")
 
 
 @pytest.mark.privileged
 @pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
-def test_check_mnt_stress(setup_mount: Path) -> None:
+def test_check_mnt_stress(setup_mount: Path, share: testhelper.Share) -> None:
     base = setup_mount / "stress-test"
-    _run_stress_tests(base)
+    _run_stress_tests([base], share)
 
 
 @pytest.mark.parametrize("test_dir", gen_params_premounted())
-def test_check_mnt_stress_premounted(test_dir: Path) -> None:
+def test_check_mnt_stress_premounted(
+    test_dir: Path, share: testhelper.Share
+) -> None:
     base = test_dir / "stress-test"
-    _run_stress_tests(base)
+    _run_stress_tests([base], share)
+
+
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mounts", gen_params_multi(), indirect=True)
+def test_check_mnt_stress_multi(
+    setup_mounts: typing.List[typing.Tuple[str, Path]],
+    share: testhelper.Share,
+) -> None:
+    bases = [test_dir / "stress-test" for _, test_dir in setup_mounts]
+    nodes = len({ipaddr for ipaddr, _ in setup_mounts})
+    # same client load for any number of mounts, so that throughput
+    # depends only on how load is spread over connections and nodes
+    _run_stress_tests(bases, share, nodes)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# Measure sequential read/write bandwidth via SMB mount-point, sweeping over
+# block sizes and I/O modes: buffered, direct (O_DIRECT) and buffered with
+# fsync after every few blocks.
+
+import pytest
+import errno
+import mmap
+import os
+import shutil
+import time
+import typing
+import testhelper
+from pathlib import Path
+from .conftest import gen_params, gen_params_premounted
+
+_file_size = 2**26
+_block_sizes = [2**12, 2**14, 2**16, 2**18, 2**20, 2**22, 2**24]
+_modes = ["buffered", "direct", "fsync"]
+_fsync_interval = 16
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _open(path: Path, mode: str, flags: int) -> int:
+    if mode == "direct":
+        flags |= os.O_DIRECT
+    try:
+        return os.open(path, flags, 0o600)
+    except OSError as ex:
+        if ex.errno == errno.EINVAL:
+            raise _Unsupported(f"{mode}: {ex}")
+        raise
+
+
+def _drop_cache(fd: int) -> None:
+    os.fsync(fd)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _write_seq(path: Path, buf: mmap.mmap, mode: str) -> float:
+    bsz = len(buf)
+    fd = _open(path, mode, os.O_CREAT | os.O_TRUNC | os.O_WRONLY)
+    try:
+        start = time.monotonic()
+        for idx in range(_file_size // bsz):
+            try:
+                nbytes = os.write(fd, buf)
+            except OSError as ex:
+                if ex.errno == errno.EINVAL and idx == 0:
+                    raise _Unsupported(f"{mode}: {ex}")
+                raise
+            if nbytes != bsz:
+                raise IOError(f"short write: {nbytes} != {bsz} {path}")
+            if mode == "fsync" and (idx + 1) % _fsync_interval == 0:
+                os.fsync(fd)
+        if mode == "fsync":
+            os.fsync(fd)
+        elapsed = time.monotonic() - start
+        _drop_cache(fd)
+    finally:
+        os.close(fd)
+    return elapsed
+
+
+def _read_seq(path: Path, buf: mmap.mmap, mode: str) -> float:
+    bsz = len(buf)
+    fd = _open(path, mode, os.O_RDONLY)
+    try:
+        start = time.monotonic()
+        for _ in range(_file_size // bsz):
+            nbytes = os.readv(fd, [buf])
+            if nbytes != bsz:
+                raise IOError(f"short read: {nbytes} != {bsz} {path}")
+        elapsed = time.monotonic() - start
+    finally:
+        os.close(fd)
+    return elapsed
+
+
+def _rate(elapsed: float) -> float:
+    return _file_size / max(elapsed, 1e-9) / 2**20
+
+
+def _run_throughput_sweep(base: Path) -> None:
+    base.mkdir(exist_ok=True)
+    path = base / "seqfile"
+    pattern = testhelper.make_data_pattern()
+    results: typing.List[typing.Tuple[str, int, str]] = []
+    try:
+        for bsz in _block_sizes:
+            # anonymous mappings are page aligned, as O_DIRECT requires
+            with mmap.mmap(-1, bsz) as buf:
+                pattern.fill(memoryview(buf), 0)
+                for mode in _modes:
+                    try:
+                        wtime = _write_seq(path, buf, mode)
+                        rtime = _read_seq(path, buf, mode)
+                        res = f"write={_rate(wtime):.1f}MB/s "
+                        res += f"read={_rate(rtime):.1f}MB/s"
+                    except _Unsupported as ex:
+                        res = f"unsupported ({ex})"
+                    results.append((mode, bsz, res))
+                    print(f"mode={mode} bs={bsz} {res}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    assert any("unsupported" not in res for _, _, res in results)
+
+
+@pytest.mark.benchmark
+@pytest.mark.privileged
+@pytest.mark.parametrize("setup_mount", gen_params(), indirect=True)
+def test_seq_throughput(setup_mount: Path) -> None:
+    base = setup_mount / "seq-throughput"
+    _run_throughput_sweep(base)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("test_dir", gen_params_premounted())
+def test_seq_throughput_premounted(test_dir: Path) -> None:
+    base = test_dir / "seq-throughput"
+    _run_throughput_sweep(base)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+# Cross-node coherency benchmark: files are re-written via one public
+# interface (node) of a share while connections to every other node poll
+# them, to measure how long it takes until new size and content become
+# visible on other nodes. Each node takes the writer's role in turn, and
+# readers connect as each of the share's users. Many files are updated
+# and polled concurrently.
+
+import testhelper
+from testhelper import SMBClient
+import concurrent.futures
+import io
+import pytest
+import random
+import threading
+import time
+import typing
+
+_num_files = 32
+_concurrency = 8
+_max_file_size = 2**16
+_poll_interval = 0.01
+_visibility_timeout = 30.0
+
+test_info = testhelper.get_test_config()
+
+# (public interface, user) to connect to the share with
+_Endpoint = typing.Tuple[str, testhelper.User]
+
+
+class _Visibility:
+    """Latencies until size and content are visible, per pair of writer
+    and reader nodes"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.size: typing.Dict[str, testhelper.LatencyHistogram] = {}
+        self.content: typing.Dict[str, testhelper.LatencyHistogram] = {}
+
+    def record(
+        self, writer: str, reader: str, size_lat: float, content_lat: float
+    ) -> None:
+        pair = f"{writer}->{reader}"
+        with self.lock:
+            if pair not in self.size:
+                self.size[pair] = testhelper.LatencyHistogram()
+                self.content[pair] = testhelper.LatencyHistogram()
+            self.size[pair].record(size_lat)
+            self.content[pair].record(content_lat)
+
+
+def _connect(
+    smb_pool: testhelper.SMBConnectionPool, share_name: str, ep: _Endpoint
+) -> SMBClient:
+    ipaddr, user = ep
+    return SMBClient(
+        ipaddr, share_name, user.username, user.password, pool=smb_pool
+    )
+
+
+def _read_all(smbclient: SMBClient, fpath: str) -> bytes:
+    with io.BytesIO() as buf:
+        smbclient.read_file(fpath, buf)
+        return buf.getvalue()
+
+
+def _new_data(old_size: int) -> bytes:
+    # a different size each time, so that size changes are observable
+    size = random.randrange(1, _max_file_size)
+    if size == old_size:
+        size += 1
+    return testhelper.make_data_pattern().read(0, size)
+
+
+def _update_file(
+    smb_pool: testhelper.SMBConnectionPool,
+    share_name: str,
+    fpath: str,
+    old_size: int,
+    writer: _Endpoint,
+    readers: typing.List[_Endpoint],
+    visibility: _Visibility,
+) -> int:
+    """Re-write a file via writer, then poll it via all readers until each
+    of them sees the new size and content"""
+    data = _new_data(old_size)
+    with _connect(smb_pool, share_name, writer) as smbclient:
+        smbclient.write_file(fpath, io.BytesIO(data))
+    written_at = time.monotonic()
+    clients = [_connect(smb_pool, share_name, ep) for ep in readers]
+    try:
+        # reader index -> latency until size was visible, if already was
+        pending: typing.Dict[int, typing.Optional[float]] = {
+            idx: None for idx in range(len(readers))
+        }
+        while pending:
+            for idx in list(pending):
+                smbclient = clients[idx]
+                if pending[idx] is None:
+                    if smbclient.stat_size(fpath) == len(data):
+                        pending[idx] = time.monotonic() - written_at
+                size_lat = pending[idx]
+                if (
+                    size_lat is not None
+                    and _read_all(smbclient, fpath) == data
+                ):
+                    visibility.record(
+                        writer[0],
+                        readers[idx][0],
+                        size_lat,
+                        time.monotonic() - written_at,
+                    )
+                    del pending[idx]
+            if not pending:
+                break
+            if time.monotonic() - written_at > _visibility_timeout:
+                stale = sorted({readers[idx][0] for idx in pending})
+                raise IOError(
+                    f"{fpath} written via {writer[0]} not visible via "
+                    f"{stale} after {_visibility_timeout}s"
+                )
+            time.sleep(_poll_interval)
+    finally:
+        for smbclient in clients:
+            smbclient.disconnect()
+    return len(data)
+
+
+def _prime_files(
+    smb_pool: testhelper.SMBConnectionPool,
+    share_name: str,
+    fpaths: typing.List[str],
+    endpoints: typing.List[_Endpoint],
+) -> typing.List[int]:
+    """Create files, then read each via all endpoints, so that clients of
+    all nodes hold (possibly cached) state of each file"""
+    sizes = []
+    with _connect(smb_pool, share_name, endpoints[0]) as smbclient:
+        for fpath in fpaths:
+            data = _new_data(0)
+            smbclient.write_file(fpath, io.BytesIO(data))
+            sizes.append(len(data))
+    for ep in endpoints:
+        with _connect(smb_pool, share_name, ep) as smbclient:
+            for fpath, size in zip(fpaths, sizes):
+                if len(_read_all(smbclient, fpath)) != size:
+                    raise IOError(f"size mismatch: {fpath} via {ep[0]}")
+    return sizes
+
+
+def _check_coherency(
+    smb_pool: testhelper.SMBConnectionPool,
+    share: testhelper.Share,
+    test_dir: str,
+) -> _Visibility:
+    interfaces = testhelper.get_public_interfaces(test_info, share)
+    endpoints = [
+        (ipaddr, user) for ipaddr in interfaces for user in share.users
+    ]
+    fpaths = [f"{test_dir}/file-{idx}" for idx in range(_num_files)]
+    sizes = _prime_files(smb_pool, share.name, fpaths, endpoints)
+    visibility = _Visibility()
+    for round_idx, ipaddr in enumerate(interfaces):
+        writer = (ipaddr, share.users[round_idx % len(share.users)])
+        # with a single node, readers use the writer's node
+        readers = [
+            ep for ep in endpoints if ep[0] != ipaddr or len(interfaces) == 1
+        ]
+        with concurrent.futures.ThreadPoolExecutor(_concurrency) as executor:
+            futures = [
+                executor.submit(
+                    _update_file,
+                    smb_pool,
+                    share.name,
+                    fpath,
+                    size,
+                    writer,
+                    readers,
+                    visibility,
+                )
+                for fpath, size in zip(fpaths, sizes)
+            ]
+            sizes = [future.result() for future in futures]
+    return visibility
+
+
+def coherency_check(
+    share_name: str, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    share = testhelper.get_share(test_info, share_name)
+    test_dir = f"/test_coherency_{random.getrandbits(32):08x}"
+    with _connect(
+        smb_pool, share_name, (share.server, share.users[0])
+    ) as smbclient:
+        smbclient.mkdir(test_dir)
+        try:
+            visibility = _check_coherency(smb_pool, share, test_dir)
+        except Exception:
+            # best effort; do not mask the test's own error
+            try:
+                smbclient.rmtree(test_dir)
+            except Exception as ex:
+                print(f"failed to remove {test_dir}: {ex}")
+            raise
+        smbclient.rmtree(test_dir)
+
+    report: typing.Dict[str, typing.Any] = {"share": share_name}
+    print()
+    for pair in sorted(visibility.size):
+        size_lat = visibility.size[pair].summary()
+        content_lat = visibility.content[pair].summary()
+        report[pair] = {"size": size_lat, "content": content_lat}
+        print(
+            f"{pair}: files={content_lat['count']} "
+            f"size_p50={size_lat['p50'] * 1000:.3f}ms "
+            f"size_p99={size_lat['p99'] * 1000:.3f}ms "
+            f"content_p50={content_lat['p50'] * 1000:.3f}ms "
+            f"content_p99={content_lat['p99'] * 1000:.3f}ms "
+            f"content_max={content_lat['max'] * 1000:.3f}ms"
+        )
+    path = testhelper.write_report(f"coherency-{share_name}", report)
+    print(f"Report: {path}")
+
+
+def generate_coherency_check() -> typing.List[str]:
+    return testhelper.get_exported_shares(test_info)
+
+
+@pytest.mark.parametrize("share_name", generate_coherency_check())
+def test_coherency(
+    share_name: str, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    coherency_check(share_name, smb_pool)
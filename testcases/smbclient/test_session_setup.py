@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# Benchmark the rate at which the server can set up new SMB sessions:
+# connections are opened concurrently across all configured users and
+# public interfaces, and the latency of negotiate, authentication and
+# tree-connect is measured separately as concurrency ramps up.
+
+import testhelper
+import concurrent.futures
+import itertools
+import pytest
+import time
+import typing
+
+test_info = testhelper.get_test_config()
+
+concurrency_levels = [1, 2, 4, 8, 16, 32]
+connects_per_worker = 8
+
+
+def _connect_once(
+    target: typing.Tuple[str, str, testhelper.User],
+) -> testhelper.SessionSetupTimes:
+    server, share_name, user = target
+    ctx, times = testhelper.timed_connect(
+        server, share_name, user.username, user.password
+    )
+    ctx.close()
+    return times
+
+
+def _print_summary(
+    concurrency: int,
+    rate: float,
+    samples: typing.Dict[str, typing.List[float]],
+) -> None:
+    print(f"concurrency={concurrency} connects/sec={rate:.1f}")
+    for phase, latencies in samples.items():
+        summary = testhelper.summarize_latencies(latencies)
+        print(
+            f"  {phase}: p50={summary['p50'] * 1000:.2f}ms "
+            f"p99={summary['p99'] * 1000:.2f}ms "
+            f"max={summary['max'] * 1000:.2f}ms"
+        )
+
+
+def session_setup_check(share_name: str) -> None:
+    share = testhelper.get_share(test_info, share_name)
+    servers = testhelper.get_public_interfaces(test_info, share)
+    targets = [
+        (server, share_name, user)
+        for server, user in itertools.product(servers, share.users)
+    ]
+    for concurrency in concurrency_levels:
+        count = concurrency * connects_per_worker
+        batch = list(itertools.islice(itertools.cycle(targets), count))
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(_connect_once, batch))
+        elapsed = time.monotonic() - start
+        samples = {
+            "transport": [t.transport for t in results],
+            "negotiate": [t.negotiate for t in results],
+            "session_setup": [t.session_setup for t in results],
+            "tree_connect": [t.tree_connect for t in results],
+            "total": [t.total for t in results],
+        }
+        _print_summary(concurrency, count / elapsed, samples)
+
+
+@pytest.mark.parametrize(
+    "share_name", testhelper.get_exported_shares(test_info)
+)
+def test_session_setup_rate(share_name: str) -> None:
+    session_setup_check(share_name)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+# Test large-file data transfers through the userspace SMB client (pysmb),
+# streaming data in fixed-size chunks and verifying it against a pattern.
+
+import testhelper
+from testhelper import SMBClient
+import pytest
+import shutil
+import time
+import typing
+from pathlib import Path
+
+test_info = testhelper.get_test_config()
+
+
+def _print_stats(name: str, stats: testhelper.TransferStats) -> None:
+    print(
+        f"{name}: nbytes={stats.nbytes} "
+        f"elapsed={stats.elapsed:.3f}s rate={stats.rate / 2**20:.2f}MB/s"
+    )
+
+
+def streaming_io_check(
+    share_name: str, smb_pool: testhelper.SMBConnectionPool, size: int
+) -> None:
+    mount_params = testhelper.get_mount_parameters(test_info, share_name)
+    test_filename = f"/test_streaming_io_{size}"
+    pattern = testhelper.make_data_pattern()
+
+    with SMBClient(
+        mount_params["host"],
+        mount_params["share"],
+        mount_params["username"],
+        mount_params["password"],
+        pool=smb_pool,
+    ) as smbclient:
+        try:
+            reader = testhelper.PatternReader(pattern, 0, size)
+            stats = smbclient.write_file(test_filename, reader)
+            _print_stats("write", stats)
+            assert stats.nbytes == size, "Short write"
+            stats = smbclient.verify_file(test_filename, pattern, 0, size)
+            _print_stats("read", stats)
+            # read back a range which is not aligned to any chunk boundary
+            offset = size // 3 + 1
+            length = size // 3
+            smbclient.verify_file(test_filename, pattern, offset, length)
+        finally:
+            smbclient.unlink(test_filename)
+
+
+def generate_streaming_io_check() -> typing.List[typing.Tuple[str, int]]:
+    arr = []
+    for sharename in testhelper.get_exported_shares(test_info):
+        for size in [2**20, 2**26]:
+            arr.append((sharename, size))
+    return arr
+
+
+@pytest.mark.parametrize("share_name,size", generate_streaming_io_check())
+def test_streaming_io(
+    share_name: str, size: int, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    streaming_io_check(share_name, smb_pool, size)
+
+
+def striped_io_check(
+    share_name: str,
+    smb_pool: testhelper.SMBConnectionPool,
+    size: int,
+    nconns: int,
+) -> None:
+    mount_params = testhelper.get_mount_parameters(test_info, share_name)
+    share = testhelper.get_share(test_info, share_name)
+    servers = testhelper.get_public_interfaces(test_info, share)
+    test_filename = f"/test_striped_io_{nconns}"
+    pattern = testhelper.make_data_pattern()
+
+    with SMBClient(
+        mount_params["host"],
+        mount_params["share"],
+        mount_params["username"],
+        mount_params["password"],
+        pool=smb_pool,
+    ) as smbclient:
+        try:
+            for name, transfer in [
+                ("write", smbclient.write_file_striped),
+                ("read", smbclient.verify_file_striped),
+            ]:
+                stats = transfer(test_filename, pattern, size, nconns, servers)
+                _print_stats(f"{name} nconns={nconns}", stats.total)
+                for idx, (server, conn_stats) in enumerate(stats.per_conn):
+                    _print_stats(f"  conn{idx} {server}", conn_stats)
+        finally:
+            smbclient.unlink(test_filename)
+
+
+def generate_striped_io_check() -> typing.List[typing.Tuple[str, int]]:
+    arr = []
+    for sharename in testhelper.get_exported_shares(test_info):
+        for nconns in [1, 2, 4, 8]:
+            arr.append((sharename, nconns))
+    return arr
+
+
+@pytest.mark.parametrize("share_name,nconns", generate_striped_io_check())
+def test_striped_io(
+    share_name: str, nconns: int, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    striped_io_check(share_name, smb_pool, 2**28, nconns)
+
+
+def _make_local_tree(root: Path, ndirs: int, nfiles: int) -> None:
+    for d in range(ndirs):
+        dpath = root / f"dir{d}" / "sub"
+        dpath.mkdir(parents=True)
+        for f in range(nfiles):
+            data = testhelper.generate_random_bytes(1024 + f)
+            (dpath.parent / f"file{f}").write_bytes(data)
+            (dpath / f"file{f}").write_bytes(data)
+
+
+def _read_local_tree(root: Path) -> typing.Dict[str, bytes]:
+    return {
+        p.relative_to(root).as_posix(): p.read_bytes()
+        for p in root.rglob("*")
+        if p.is_file()
+    }
+
+
+def tree_ops_check(
+    share_name: str, smb_pool: testhelper.SMBConnectionPool, concurrency: int
+) -> None:
+    mount_params = testhelper.get_mount_parameters(test_info, share_name)
+    remote_dir = f"/test_tree_ops_{concurrency}"
+    tmp_root = testhelper.get_tmp_root()
+    local_src = tmp_root / "src"
+    local_dst = tmp_root / "dst"
+
+    with SMBClient(
+        mount_params["host"],
+        mount_params["share"],
+        mount_params["username"],
+        mount_params["password"],
+        pool=smb_pool,
+    ) as smbclient:
+        try:
+            _make_local_tree(local_src, 10, 50)
+            start = time.monotonic()
+            smbclient.upload_tree(local_src, remote_dir, concurrency)
+            upload_time = time.monotonic() - start
+            nfiles = sum(
+                len(files) for _, _, files in smbclient.walk(remote_dir)
+            )
+            assert nfiles == 10 * 50 * 2, "Missing files"
+            start = time.monotonic()
+            smbclient.download_tree(remote_dir, local_dst, concurrency)
+            download_time = time.monotonic() - start
+            assert _read_local_tree(local_src) == _read_local_tree(
+                local_dst
+            ), "Tree content does not match"
+            start = time.monotonic()
+            smbclient.rmtree(remote_dir, concurrency)
+            rmtree_time = time.monotonic() - start
+            assert remote_dir.lstrip("/") not in smbclient.listdir("/")
+        except Exception:
+            # best effort; do not mask the test's own error
+            try:
+                smbclient.rmtree(remote_dir, concurrency)
+            except Exception as ex:
+                print(f"failed to remove {remote_dir}: {ex}")
+            raise
+        finally:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+        print(
+            f"concurrency={concurrency} upload={upload_time:.3f}s "
+            f"download={download_time:.3f}s rmtree={rmtree_time:.3f}s "
+            f"ops={dict(smbclient.counters)}"
+        )
+
+
+def generate_tree_ops_check() -> typing.List[typing.Tuple[str, int]]:
+    arr = []
+    for sharename in testhelper.get_exported_shares(test_info):
+        for concurrency in [1, 8]:
+            arr.append((sharename, concurrency))
+    return arr
+
+
+@pytest.mark.parametrize("share_name,concurrency", generate_tree_ops_check())
+def test_tree_ops(
+    share_name: str, concurrency: int, smb_pool: testhelper.SMBConnectionPool
+) -> None:
+    tree_ops_check(share_name, smb_pool, concurrency)
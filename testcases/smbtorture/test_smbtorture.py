@@ -16,8 +16,7 @@ filter_subunit_exec = script_root + "/selftest/filter-subunit"
 format_subunit_exec = script_root + "/selftest/format-subunit"
 smbtorture_tests_file = script_root + "/smbtorture-tests-info.yml"
 
-test_info_file = os.getenv("TEST_INFO_FILE")
-test_info = testhelper.read_yaml(test_info_file)
+test_info = testhelper.get_test_config()
 
 
 def smbtorture(share_name: str, test: str, tmp_output: Path) -> bool:
@@ -49,14 +48,10 @@ def smbtorture(share_name: str, test: str, tmp_output: Path) -> bool:
         )
     flapping_list = ["flapping", "flapping.d"]
     share = testhelper.get_share(test_info, share_name)
-    test_backend = share["backend"].get("name")
-    if test_backend is not None:
-        flapping_file = "flapping." + test_backend
-        flapping_file_path = os.path.join(
-            script_root, "selftest", flapping_file
-        )
-        if os.path.exists(flapping_file_path):
-            flapping_list.append(flapping_file)
+    flapping_file = "flapping." + share.backend.name
+    flapping_file_path = os.path.join(script_root, "selftest", flapping_file)
+    if os.path.exists(flapping_file_path):
+        flapping_list.append(flapping_file)
     for filter in flapping_list:
         filter_subunit_cmd.append(
             "--flapping=" + script_root + "/selftest/" + filter
@@ -1,4 +1,7 @@
 from .testhelper import *  # noqa: F401, F403
 from .cmdhelper import *  # noqa: F401, F403
 from .fshelper import *  # noqa: F401, F403
+from .datahelper import *  # noqa: F401, F403
+from .perfhelper import *  # noqa: F401, F403
+from .mounthelper import *  # noqa: F401, F403
 from .smbclient import *  # noqa: F401, F403
@@ -2,65 +2,252 @@ import os
 import subprocess
 import typing
 import shutil
+import time
+import threading
+import dataclasses
 from pathlib import Path
 
 
+@dataclasses.dataclass
+class RetryPolicy:
+    """Bounded retry with exponential backoff for external commands"""
+
+    attempts: int = 3
+    delay: float = 1.0
+    backoff: float = 2.0
+    max_delay: float = 10.0
+
+    def delays(self) -> typing.Iterator[float]:
+        delay = self.delay
+        for _ in range(self.attempts - 1):
+            yield min(delay, self.max_delay)
+            delay *= self.backoff
+
+
+@dataclasses.dataclass
+class MountResult:
+    """Outcome of a mount or umount command"""
+
+    op: str
+    source: str
+    mount_point: Path
+    cmd: typing.List[str]
+    returncode: int = -1
+    stderr: str = ""
+    elapsed: float = 0.0
+    attempts: int = 0
+    options: typing.Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+class MountStats:
+    """Thread-safe collector of mount and umount results"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.results: typing.List[MountResult] = []
+
+    def add(self, result: MountResult) -> None:
+        with self._lock:
+            self.results.append(result)
+
+    def summary(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """Summarize latencies in seconds by source and operation.
+
+        Returns:
+        dict: Per source (//host/share) dict of per-operation statistics.
+        """
+        with self._lock:
+            results = list(self.results)
+        ret: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        for res in results:
+            ent = ret.setdefault(res.source, {}).setdefault(
+                res.op,
+                {"count": 0, "failed": 0, "retries": 0, "latencies": []},
+            )
+            ent["count"] += 1
+            ent["failed"] += int(res.returncode != 0)
+            ent["retries"] += max(res.attempts - 1, 0)
+            ent["latencies"].append(res.elapsed)
+            if res.options:
+                ent["options"] = res.options
+        for ops in ret.values():
+            for ent in ops.values():
+                lat = ent.pop("latencies")
+                ent["avg"] = sum(lat) / len(lat)
+                ent["min"] = min(lat)
+                ent["max"] = max(lat)
+        return ret
+
+
+mount_stats = MountStats()
+
+
+def _unescape_mount_field(field: str) -> str:
+    for esc, char in (("\\040", " "), ("\\011", "\t"), ("\\012", "\n")):
+        field = field.replace(esc, char)
+    return field.replace("\\134", "\\")
+
+
+def get_mount_entry(
+    mount_point: Path,
+) -> typing.Optional[typing.Tuple[str, str, typing.Dict[str, str]]]:
+    """Find mount-point in /proc/mounts.
+
+    Parameters:
+    mount_point: Directory of the mount point.
+
+    Returns:
+    tuple: source, fs-type and dict of the mount options of the most
+    recent mount at mount_point, or None if not mounted.
+    """
+    ret = None
+    mnt = os.path.realpath(mount_point)
+    with open("/proc/mounts") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 4 or _unescape_mount_field(fields[1]) != mnt:
+                continue
+            options = {}
+            for opt in fields[3].split(","):
+                key, _, val = opt.partition("=")
+                options[key] = val
+            ret = (_unescape_mount_field(fields[0]), fields[2], options)
+    return ret
+
+
+def _parse_cifs_flushes(stats: str, unc: str) -> typing.Optional[int]:
+    # sections of per-share counters begin with "<N>) \\server\share"
+    flushes = None
+    in_share = False
+    for line in stats.splitlines():
+        head, sep, tree = line.partition(") ")
+        if sep and head.strip().isdigit() and tree.split():
+            in_share = tree.split()[0].lower() == unc.lower()
+        elif in_share and line.startswith("Flushes:"):
+            flushes = (flushes or 0) + int(line.split()[1])
+    return flushes
+
+
+def get_cifs_flush_count(path: Path) -> typing.Optional[int]:
+    """Get the number of flush requests sent to the share of a cifs mount.
+
+    Every fsync of a file on a cifs mount sends a flush request to the
+    server. Counters are kept by the kernel per share connection, and may
+    therefore include requests issued via other mounts of the same share.
+
+    Parameters:
+    path: Any path within a cifs mount.
+
+    Returns:
+    int: Total flush requests sent for the share of path, or None if path
+    is not within a cifs mount or counters are not available.
+    """
+    mnt = os.path.realpath(path)
+    while not os.path.ismount(mnt):
+        mnt = os.path.dirname(mnt)
+    entry = get_mount_entry(Path(mnt))
+    if entry is None or entry[1] not in ("cifs", "smb3"):
+        return None
+    try:
+        with open("/proc/fs/cifs/Stats") as f:
+            stats = f.read()
+    except OSError:
+        return None
+    return _parse_cifs_flushes(stats, entry[0].replace("/", "\\"))
+
+
+def _run_mount_cmd(
+    result: MountResult,
+    env: typing.Optional[typing.Dict[str, str]],
+    retry: RetryPolicy,
+) -> None:
+    delays = retry.delays()
+    while True:
+        result.attempts += 1
+        start = time.monotonic()
+        ret = subprocess.run(
+            result.cmd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        result.elapsed = time.monotonic() - start
+        result.returncode = ret.returncode
+        result.stderr = ret.stderr.strip()
+        delay = next(delays, None)
+        if result.returncode == 0 or delay is None:
+            break
+        time.sleep(delay)
+
+
 def cifs_mount(
-    mount_params: typing.Dict[str, str], mount_point: Path, opts: str = ""
-) -> int:
+    mount_params: typing.Dict[str, str],
+    mount_point: Path,
+    opts: str = "",
+    retry: typing.Optional[RetryPolicy] = None,
+) -> MountResult:
     """Use the cifs module to mount a share.
 
+    The mount command is executed without a shell, with the password passed
+    via environment, and retried according to the given policy. Its result
+    is recorded in 'mount_stats'.
+
     Parameters:
     mount_params: Dict containing mount parameters
     mount_point: Directory location to mount the share.
     opts: Additional options to pass to the mount command
+    retry: Retry policy in case of mount failure.
 
     Returns:
-    int: return value of the mount command.
+    MountResult: outcome of the mount command, including latency of the
+    last attempt and the options negotiated by the kernel.
     """
-
-    if not opts:
-        mount_options = (
-            "username="
-            + mount_params["username"]
-            + ",password="
-            + mount_params["password"]
-        )
-    else:
-        mount_options = (
-            opts
-            + ",username="
-            + mount_params["username"]
-            + ",password="
-            + mount_params["password"]
-        )
+    mount_options = "username=" + mount_params["username"]
+    if opts:
+        mount_options = opts + "," + mount_options
     share = "//" + mount_params["host"] + "/" + mount_params["share"]
-    cmd = (
-        "mount -t cifs -o "
-        + mount_options
-        + " "
-        + share
-        + " "
-        + str(mount_point)
+    cmd = ["mount", "-t", "cifs", "-o", mount_options, share, str(mount_point)]
+    env = dict(os.environ, PASSWD=mount_params["password"])
+    result = MountResult("mount", share, mount_point, cmd)
+    _run_mount_cmd(result, env, retry or RetryPolicy())
+    if result.returncode == 0:
+        entry = get_mount_entry(mount_point)
+        if entry is not None:
+            result.options = entry[2]
+    mount_stats.add(result)
+    assert result.returncode == 0, "Error mounting: ret %d cmd: %s: %s\n" % (
+        result.returncode,
+        " ".join(cmd),
+        result.stderr,
     )
-    ret = os.system(cmd)
-    assert ret == 0, "Error mounting: ret %d cmd: %s\n" % (ret, cmd)
-    return ret
+    return result
 
 
-def cifs_umount(mount_point: Path) -> int:
+def cifs_umount(
+    mount_point: Path, retry: typing.Optional[RetryPolicy] = None
+) -> MountResult:
     """Unmount a mounted filesystem.
 
     Parameters:
     mount_point: Directory of the mount point.
+    retry: Retry policy in case of umount failure.
 
     Returns:
-    int: return value of the umount command.
+    MountResult: outcome of the umount command.
     """
-    cmd = "umount -fl %s" % (mount_point)
-    ret = os.system(cmd)
-    assert ret == 0, "Error mounting: ret %d cmd: %s\n" % (ret, cmd)
-    return ret
+    entry = get_mount_entry(mount_point)
+    source = entry[0] if entry is not None else str(mount_point)
+    cmd = ["umount", "-fl", str(mount_point)]
+    result = MountResult("umount", source, mount_point, cmd)
+    _run_mount_cmd(result, None, retry or RetryPolicy(attempts=1))
+    mount_stats.add(result)
+    assert result.returncode == 0, "Error unmounting: ret %d cmd: %s: %s\n" % (
+        result.returncode,
+        " ".join(cmd),
+        result.stderr,
+    )
+    return result
 
 
 def check_cmds(cmds: typing.List[str]) -> Path:
@@ -0,0 +1,346 @@
+import hashlib
+import itertools
+import math
+import random
+import struct
+import typing
+
+# All patterns are windows into one shared pool of random bytes, created
+# once per process from a fixed seed so that any process regenerates the
+# exact same stream for a given pattern seed.
+_POOL_SEED = 0x5174E57C
+_POOL_SIZE = 2**20
+_BLOCK_SIZE = 4096
+_STAMP = struct.Struct("<QQ")
+# A mismatching run ends only at a block of this size which fully matches
+_MISMATCH_BLOCK_SIZE = 512
+_MASK64 = 2**64 - 1
+_GOLDEN64 = 0x9E3779B97F4A7C15
+_pool: typing.Optional[memoryview] = None
+
+
+def _get_pool() -> memoryview:
+    global _pool
+    if _pool is None:
+        rnd = random.Random(_POOL_SEED)
+        _pool = memoryview(rnd.randbytes(_POOL_SIZE + _BLOCK_SIZE))
+    return _pool
+
+
+class DataPattern:
+    """Seeded, offset-addressable stream of semi-random bytes.
+
+    The logical stream is an endless sequence of 4K blocks. Each block is
+    a window into a shared pool of random bytes, selected by the seed and
+    the block's index, and stamped at its head with both so that no two
+    blocks of any stream are alike. Any byte range [offset, offset+len) of
+    the stream can be regenerated on demand without materializing what
+    precedes it, which lets writers stream large files in fixed chunks and
+    verifiers re-create expected data per block.
+    """
+
+    BLOCK_SIZE = _BLOCK_SIZE
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed & _MASK64
+        self._salt = random.Random(self.seed).getrandbits(64)
+        self._pool = _get_pool()
+
+    def __reduce__(self) -> typing.Tuple[type, typing.Tuple[int]]:
+        return (DataPattern, (self.seed,))
+
+    def __repr__(self) -> str:
+        return f"DataPattern(seed={self.seed:#x})"
+
+    def _pool_offset(self, bidx: int) -> int:
+        return ((self._salt + bidx * _GOLDEN64) & _MASK64) % _POOL_SIZE
+
+    def _fill_block(self, dst: memoryview, bidx: int, boff: int) -> None:
+        start = self._pool_offset(bidx) + boff
+        end = start + len(dst)
+        dst[:] = self._pool[start:end]
+        if boff < _STAMP.size:
+            stamp = _STAMP.pack(self.seed, bidx & _MASK64)
+            slen = min(_STAMP.size - boff, len(dst))
+            dst[:slen] = stamp[boff:][:slen]
+
+    def fill(
+        self, buf: typing.Union[bytearray, memoryview], offset: int
+    ) -> None:
+        """Fill caller-supplied buffer with stream bytes starting at offset.
+
+        Parameters:
+        buf: Writable buffer; its entire length is filled.
+        offset: Offset within the logical stream of the first byte.
+        """
+        mv = memoryview(buf).cast("B")
+        mlen = len(mv)
+        pos = 0
+        while pos < mlen:
+            bidx, boff = divmod(offset + pos, _BLOCK_SIZE)
+            end = min(pos + _BLOCK_SIZE - boff, mlen)
+            self._fill_block(mv[pos:end], bidx, boff)
+            pos = end
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Return stream bytes of range [offset, offset+length) as a copy.
+
+        Parameters:
+        offset: Offset within the logical stream.
+        length: Number of bytes to generate.
+
+        Returns:
+        bytes: The generated range.
+        """
+        buf = bytearray(length)
+        self.fill(buf, offset)
+        return bytes(buf)
+
+    def chunks(
+        self, offset: int, length: int, chunk_size: int = 2**20
+    ) -> typing.Iterator[memoryview]:
+        """Iterate over range [offset, offset+length) in fixed-size chunks.
+
+        The same underlying buffer is reused for every chunk, therefore
+        each yielded view is valid only until the next iteration.
+
+        Parameters:
+        offset: Offset within the logical stream.
+        length: Total number of bytes to generate.
+        chunk_size: Maximal size of each chunk.
+        """
+        buf = memoryview(bytearray(min(length, chunk_size)))
+        pos = 0
+        while pos < length:
+            cnt = min(chunk_size, length - pos)
+            view = buf[:cnt]
+            self.fill(view, offset + pos)
+            yield view
+            pos += cnt
+
+    def compare(
+        self,
+        data: typing.Union[bytes, bytearray, memoryview],
+        offset: int,
+        chunk_size: int = 2**20,
+    ) -> int:
+        """Compare data against the stream, starting at offset.
+
+        Parameters:
+        data: Buffer to compare.
+        offset: Offset within the logical stream of the first byte of data.
+        chunk_size: Size of scratch buffer used to regenerate stream bytes.
+
+        Returns:
+        int: Index within data of the first mismatching byte, or -1 if all
+        bytes are equal.
+        """
+        mv = memoryview(data).cast("B")
+        pos = 0
+        for expected in self.chunks(offset, len(mv), chunk_size):
+            end = pos + len(expected)
+            actual = mv[pos:end]
+            if actual != expected:
+                for idx in range(len(expected)):
+                    if actual[idx] != expected[idx]:
+                        return pos + idx
+            pos = end
+        return -1
+
+    def find_mismatch(
+        self,
+        data: typing.Union[bytes, bytearray, memoryview],
+        offset: int,
+    ) -> typing.Optional[typing.Tuple[int, int]]:
+        """Find the first run of bytes in data which differ from the stream.
+
+        The run is extended block by block, for as long as each block of
+        _MISMATCH_BLOCK_SIZE bytes holds any differing byte, and ends at
+        the last differing byte. Bytes within the run which happen to
+        match (as random bytes do, one in 256) do not end it.
+
+        Parameters:
+        data: Buffer to compare.
+        offset: Offset within the logical stream of the first byte of data.
+
+        Returns:
+        tuple: Index within data of the first mismatching byte and the
+        length of the mismatching run from there on, or None if all bytes
+        are equal.
+        """
+        idx = self.compare(data, offset)
+        if idx < 0:
+            return None
+        mv = memoryview(data).cast("B")
+        end = pos = idx
+        while pos < len(mv):
+            stop = min(pos + _MISMATCH_BLOCK_SIZE, len(mv))
+            block = mv[pos:stop]
+            expected = self.read(offset + pos, len(block))
+            if block == expected:
+                break
+            last = len(block) - 1
+            while block[last] == expected[last]:
+                last -= 1
+            end = pos + last + 1
+            pos = stop
+        return (idx, end - idx)
+
+
+def make_data_pattern() -> DataPattern:
+    """Create a new data-pattern with a seed drawn from 'random'.
+
+    Returns:
+    DataPattern: pattern seeded from the global random state.
+    """
+    return DataPattern(random.getrandbits(64))
+
+
+class PatternReader:
+    """Read-only file-like view of a range of a data-pattern stream.
+
+    Lets consumers which pull data from a file object (such as pysmb's
+    storeFile) stream pattern bytes without a whole-file buffer.
+    """
+
+    def __init__(self, pattern: DataPattern, offset: int, length: int):
+        self.pattern = pattern
+        self.offset = offset
+        self.length = length
+        self.pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        remain = self.length - self.pos
+        if size < 0 or size > remain:
+            size = remain
+        data = self.pattern.read(self.offset + self.pos, size)
+        self.pos += size
+        return data
+
+
+class PatternVerifier:
+    """Write-only file-like sink which compares data with a pattern stream.
+
+    Consumed data is checked on the fly and dropped. The first mismatch
+    found is recorded rather than raised, so that producers (such as
+    pysmb's retrieveFile) can complete the transfer; callers should check
+    'mismatch' when done.
+    """
+
+    def __init__(self, pattern: DataPattern, offset: int = 0):
+        self.pattern = pattern
+        self.offset = offset
+        self.pos = 0
+        self.mismatch = -1
+
+    def write(self, data: typing.Union[bytes, bytearray, memoryview]) -> int:
+        dlen = len(data)
+        if self.mismatch < 0:
+            idx = self.pattern.compare(data, self.offset + self.pos)
+            if idx >= 0:
+                self.mismatch = self.offset + self.pos + idx
+        self.pos += dlen
+        return dlen
+
+
+class RecordSet:
+    """Seeded, compact key-value records for integer keys.
+
+    Record of integer key K has fixed-width binary key and value, both
+    derived from K, the set's seed and the record's generation (which is
+    bumped upon updates): the value is K and the generation, followed by
+    a keyed digest of both. Records are generated on demand, in batches,
+    so that sets of millions of records never exist as whole in memory.
+    """
+
+    __slots__ = ("seed", "_salt")
+
+    KEY_SIZE = 8
+    VALUE_SIZE = 32
+    _key = struct.Struct(">Q")
+    _head = struct.Struct("<QQ")
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed & _MASK64
+        self._salt = struct.pack("<Q", self.seed)
+
+    def __reduce__(self) -> typing.Tuple[type, typing.Tuple[int]]:
+        return (RecordSet, (self.seed,))
+
+    def key(self, ikey: int) -> bytes:
+        return self._key.pack(ikey)
+
+    def value(self, ikey: int, gen: int = 0) -> bytes:
+        head = self._head.pack(ikey, gen)
+        digest = hashlib.blake2b(head, digest_size=16, key=self._salt)
+        return head + digest.digest()
+
+    def items(
+        self, ikeys: typing.Iterable[int], gen: int = 0
+    ) -> typing.Iterator[typing.Tuple[bytes, bytes]]:
+        """Generate (key, value) pairs of records, in order of ikeys"""
+        for ikey in ikeys:
+            yield (self.key(ikey), self.value(ikey, gen))
+
+    def check(
+        self,
+        ikeys: typing.Sequence[int],
+        values: typing.Sequence[typing.Optional[bytes]],
+        gen: int = 0,
+    ) -> None:
+        """Verify a batch of values fetched for keys ikeys.
+
+        Parameters:
+        ikeys: Integer keys of the batch.
+        values: Values as fetched for each of ikeys; None if not found.
+        gen: Expected generation of all records of the batch.
+
+        Raises:
+        ValueError: upon the first missing or mismatching value.
+        """
+        assert len(values) == len(ikeys), "Number of values and keys differ"
+        expected = [self.value(ikey, gen) for ikey in ikeys]
+        found = [val for val in values if val is not None]
+        if len(found) == len(expected):
+            # fast path: compare whole batch at once
+            if b"".join(found) == b"".join(expected):
+                return
+        for ikey, val, exp in zip(ikeys, values, expected):
+            if val is None:
+                raise ValueError(f"missing record: {ikey}")
+            if val != exp:
+                raise ValueError(
+                    f"record mismatch: {ikey} {val.hex()} != {exp.hex()}"
+                )
+
+
+def batched(
+    iterable: typing.Iterable[int], batch_size: int
+) -> typing.Iterator[typing.List[int]]:
+    """Split iterable into lists of up to batch_size items"""
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def permuted_range(
+    start: int, stop: int, rnd: random.Random
+) -> typing.Iterator[int]:
+    """Iterate over range [start, stop) in a pseudo-random order.
+
+    Elements are generated on the fly by an affine map modulo the range
+    length, rather than by shuffling a list, which suits huge ranges.
+    """
+    count = stop - start
+    if count <= 0:
+        return
+    step = rnd.randrange(1, count + 1)
+    while math.gcd(step, count) != 1:
+        step = rnd.randrange(1, count + 1)
+    pos = rnd.randrange(count)
+    for _ in range(count):
+        yield start + pos
+        pos = (pos + step) % count
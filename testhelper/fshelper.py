@@ -1,4 +1,5 @@
 import os
+import ctypes
 import tempfile
 from pathlib import Path
 
@@ -55,3 +56,29 @@ def get_tmp_dir(tmp_root: Path = Path(tempfile.gettempdir())) -> Path:
     tmp_dir: Location of temporary directory.
     """
     return Path(tempfile.mkdtemp(dir=tmp_root))
+
+
+# From linux/falloc.h
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+
+
+def punch_hole(fd: int, offset: int, length: int) -> None:
+    """
+    Deallocate a range of an open file, leaving a hole which reads as zeros
+
+    Parameters:
+    fd: File descriptor opened for writing.
+    offset: Start of the range to punch.
+    length: Length of the range to punch.
+    """
+    libc = ctypes.CDLL(None, use_errno=True)
+    ret = libc.fallocate(
+        ctypes.c_int(fd),
+        ctypes.c_int(FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE),
+        ctypes.c_int64(offset),
+        ctypes.c_int64(length),
+    )
+    if ret != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import threading
+import typing
+from pathlib import Path
+from .cmdhelper import cifs_mount, cifs_umount
+from .fshelper import get_tmp_root, get_tmp_mount_point
+
+# (server, share, username, mount options, instance)
+MountKey = typing.Tuple[str, str, str, str, int]
+
+
+class _PooledMount:
+    """A single cifs mount held by the pool"""
+
+    __slots__ = ("key", "mount_params", "opts", "tmp_root", "mount_point")
+
+    def __init__(
+        self, key: MountKey, mount_params: typing.Dict[str, str], opts: str
+    ) -> None:
+        self.key = key
+        self.mount_params = dict(mount_params)
+        self.opts = opts
+        self.tmp_root = get_tmp_root()
+        self.mount_point = get_tmp_mount_point(self.tmp_root)
+
+    def mount(self) -> None:
+        cifs_mount(self.mount_params, self.mount_point, self.opts)
+
+    def umount(self) -> None:
+        cifs_umount(self.mount_point)
+
+    def is_healthy(self) -> bool:
+        if not os.path.ismount(self.mount_point):
+            return False
+        try:
+            os.statvfs(self.mount_point)
+            os.listdir(self.mount_point)
+        except OSError:
+            return False
+        return True
+
+    def remove(self) -> None:
+        self.mount_point.rmdir()
+        self.tmp_root.rmdir()
+
+
+class MountPool:
+    """Session-wide pool of cifs mounts shared by many tests.
+
+    Mounts are created lazily on first use of each (server, share, user,
+    mount options, instance) combination and kept mounted until close().
+    Distinct instances are independent mounts of the very same share,
+    which (with nosharesock) each have their own connection to server.
+    Each user of the pool gets its own fresh sub-directory within the
+    shared mount, which is removed upon release. A mount which is found
+    stale when handed out is unmounted and mounted again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._mounts: typing.Dict[MountKey, _PooledMount] = {}
+        self._refcnt: typing.Dict[MountKey, int] = {}
+        self._test_dirs: typing.Dict[Path, MountKey] = {}
+
+    @staticmethod
+    def make_key(
+        mount_params: typing.Dict[str, str], opts: str, instance: int = 0
+    ) -> MountKey:
+        return (
+            mount_params["host"],
+            mount_params["share"],
+            mount_params["username"],
+            opts,
+            instance,
+        )
+
+    def _get_mount(
+        self, mount_params: typing.Dict[str, str], opts: str, instance: int
+    ) -> _PooledMount:
+        key = self.make_key(mount_params, opts, instance)
+        mnt = self._mounts.get(key)
+        if mnt is None:
+            mnt = _PooledMount(key, mount_params, opts)
+            try:
+                mnt.mount()
+            except Exception:
+                mnt.remove()
+                raise
+            self._mounts[key] = mnt
+            self._refcnt[key] = 0
+        elif not mnt.is_healthy():
+            try:
+                mnt.umount()
+            except Exception as ex:
+                print(f"Failed to unmount stale {mnt.mount_point}: {ex}")
+            mnt.mount()
+        return mnt
+
+    def acquire(
+        self,
+        mount_params: typing.Dict[str, str],
+        opts: str = "",
+        instance: int = 0,
+    ) -> Path:
+        """Get a private test directory within a pooled mount of a share.
+
+        Parameters:
+        mount_params: Dict containing mount parameters
+        opts: Additional options to pass to the mount command
+        instance: Index of independent mount with same parameters
+
+        Returns:
+        Path: new empty directory within the mounted share.
+        """
+        with self._lock:
+            mnt = self._get_mount(mount_params, opts, instance)
+            test_dir = Path(
+                tempfile.mkdtemp(prefix="mount_test_", dir=mnt.mount_point)
+            )
+            self._refcnt[mnt.key] += 1
+            self._test_dirs[test_dir] = mnt.key
+        return test_dir
+
+    def release(self, test_dir: Path) -> None:
+        """Remove a test directory previously returned by acquire().
+
+        The underlying mount stays in the pool until close().
+
+        Parameters:
+        test_dir: Directory returned by acquire().
+        """
+        shutil.rmtree(test_dir, ignore_errors=True)
+        with self._lock:
+            key = self._test_dirs.pop(test_dir)
+            self._refcnt[key] -= 1
+
+    def close(self) -> None:
+        """Unmount and remove all pooled mounts.
+
+        All mounts are torn down even if some are still in use (i.e. were
+        not released), in which case close() fails after teardown.
+        """
+        with self._lock:
+            busy = [k for k, cnt in self._refcnt.items() if cnt > 0]
+            for test_dir in self._test_dirs:
+                shutil.rmtree(test_dir, ignore_errors=True)
+            errors = []
+            for mnt in self._mounts.values():
+                try:
+                    mnt.umount()
+                    mnt.remove()
+                except Exception as ex:
+                    errors.append(f"{mnt.mount_point}: {ex}")
+            self._mounts.clear()
+            self._refcnt.clear()
+            self._test_dirs.clear()
+        assert (
+            not busy and not errors
+        ), f"Mounts still in use: {busy}; teardown failed: {errors}"
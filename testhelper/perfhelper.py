@@ -0,0 +1,163 @@
+import json
+import math
+import os
+import tempfile
+import typing
+from pathlib import Path
+
+
+def percentile(samples: typing.Sequence[float], pct: float) -> float:
+    """Get a percentile of samples, using the nearest-rank method.
+
+    Parameters:
+    samples: Sequence of samples, not necessarily sorted.
+    pct: Percentile in the range [0, 100].
+
+    Returns:
+    float: The sample at the given percentile, or 0 if there are none.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize_latencies(
+    samples: typing.Sequence[float],
+) -> typing.Dict[str, float]:
+    """Summarize latency samples.
+
+    Parameters:
+    samples: Sequence of latencies, in seconds.
+
+    Returns:
+    dict: count, mean, p50, p90, p99 and max of samples.
+    """
+    count = len(samples)
+    return {
+        "count": count,
+        "mean": sum(samples) / count if count else 0.0,
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "p99": percentile(samples, 99),
+        "max": max(samples) if count else 0.0,
+    }
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies, in the spirit of HdrHistogram.
+
+    Latencies are recorded in microseconds into buckets which are linear
+    within each power of two, with 2**SUB_BITS buckets per power, so that
+    any recorded value is represented with a relative error of less than
+    1/2**SUB_BITS. Histograms are cheap to record into, compact regardless
+    of the number of samples, and can be merged.
+    """
+
+    SUB_BITS = 5
+
+    def __init__(self) -> None:
+        self.counts: typing.Dict[int, int] = {}
+        self.count = 0
+        self.total_usec = 0
+        self.max_usec = 0
+
+    @classmethod
+    def _index_of(cls, usec: int) -> int:
+        shift = max(usec.bit_length() - cls.SUB_BITS - 1, 0)
+        if shift == 0:
+            return usec
+        top = usec >> shift
+        return ((shift + 1) << cls.SUB_BITS) + top - (1 << cls.SUB_BITS)
+
+    @classmethod
+    def _lowest_of(cls, index: int) -> int:
+        if index < (2 << cls.SUB_BITS):
+            return index
+        shift = (index >> cls.SUB_BITS) - 1
+        top = (index & ((1 << cls.SUB_BITS) - 1)) + (1 << cls.SUB_BITS)
+        return top << shift
+
+    def record(self, seconds: float) -> None:
+        """Record a single latency, given in seconds"""
+        usec = int(seconds * 1000000)
+        index = self._index_of(usec)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_usec += usec
+        self.max_usec = max(self.max_usec, usec)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add all values recorded into other histogram into this one"""
+        for index, cnt in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + cnt
+        self.count += other.count
+        self.total_usec += other.total_usec
+        self.max_usec = max(self.max_usec, other.max_usec)
+
+    def percentile(self, pct: float) -> float:
+        """Get the latency at a percentile, in seconds.
+
+        The value returned is the highest value equivalent to the bucket
+        the percentile falls in, bounded by the maximal recorded value.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(pct / 100.0 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                usec = min(self._lowest_of(index + 1) - 1, self.max_usec)
+                return usec / 1000000
+        return self.max_usec / 1000000
+
+    def summary(self) -> typing.Dict[str, float]:
+        """Summarize recorded latencies.
+
+        Returns:
+        dict: count, mean, p50, p90, p99, p99.9 and max, in seconds.
+        """
+        mean_usec = self.total_usec / self.count if self.count else 0
+        return {
+            "count": self.count,
+            "mean": mean_usec / 1000000,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max_usec / 1000000,
+        }
+
+
+def get_report_dir() -> Path:
+    """Get the directory into which test reports are written.
+
+    Returns:
+    Path: value of TEST_REPORT_DIR environment variable, or a directory
+    under the system's temporary directory if not set.
+    """
+    report_dir = os.environ.get("TEST_REPORT_DIR")
+    if report_dir:
+        return Path(report_dir)
+    return Path(tempfile.gettempdir()) / "sit-test-reports"
+
+
+def write_report(name: str, report: typing.Dict[str, typing.Any]) -> Path:
+    """Write a test report as a JSON artifact.
+
+    Parameters:
+    name: Base name of the report file, without suffix.
+    report: JSON-serializable report contents.
+
+    Returns:
+    Path: The report file written.
+    """
+    report_dir = get_report_dir()
+    report_dir.mkdir(parents=True, exist_ok=True)
+    path = report_dir / f"{name}.json"
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
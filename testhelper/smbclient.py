@@ -1,39 +1,489 @@
 from smb.SMBConnection import SMBConnection  # type: ignore
 from smb import smb_structs, base  # type: ignore
+from smb.smb_constants import SMB_COM_TREE_CONNECT_ANDX  # type: ignore
+from smb.smb2_constants import SMB2_COM_TREE_CONNECT  # type: ignore
 import typing
 import io
+import time
+import threading
+import contextlib
+import dataclasses
+import concurrent.futures
+import collections
+import posixpath
+import os
+from pathlib import Path
+from .datahelper import DataPattern, PatternReader, PatternVerifier
+
+# (server, share, username)
+PoolKey = typing.Tuple[str, str, str]
+
+
+def _new_connection(
+    hostname: str, username: str, passwd: str
+) -> SMBConnection:
+    try:
+        ctx = SMBConnection(
+            username,
+            passwd,
+            "smbclient",
+            hostname,
+            use_ntlm_v2=True,
+        )
+        authenticated = ctx.connect(hostname)
+    except base.SMBTimeout as error:
+        raise IOError(f"failed to connect: {error}")
+    if not authenticated:
+        ctx.close()
+        raise IOError(f"failed to authenticate: {username}@{hostname}")
+    return ctx
+
+
+@dataclasses.dataclass
+class TransferStats:
+    """Amount of data moved by a transfer and its wall-clock duration"""
+
+    nbytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Transfer rate in bytes per second"""
+        return self.nbytes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclasses.dataclass
+class StripedTransferStats:
+    """Aggregate and per-connection results of a striped transfer"""
+
+    total: TransferStats
+    per_conn: typing.List[typing.Tuple[str, TransferStats]]
+
+
+def _split_ranges(
+    size: int, nparts: int, align: int
+) -> typing.List[typing.Tuple[int, int]]:
+    part = -(-size // nparts)
+    part = -(-part // align) * align
+    return [
+        (off, min(part, size - off)) for off in range(0, size, max(part, 1))
+    ]
+
+
+class _ChunkReader:
+    """Limit each read of a source to chunk_size and count bytes read"""
+
+    def __init__(self, source: typing.Any, chunk_size: int) -> None:
+        self.source = source
+        self.chunk_size = chunk_size
+        self.nbytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        data = self.source.read(size)
+        self.nbytes += len(data)
+        return data
+
+
+class _CountingWriter:
+    """Forward writes to a sink and count bytes written"""
+
+    def __init__(self, sink: typing.Any) -> None:
+        self.sink = sink
+        self.nbytes = 0
+
+    def write(self, data: bytes) -> int:
+        self.sink.write(data)
+        self.nbytes += len(data)
+        return len(data)
+
+
+class _WorkerPool:
+    """Thread-pool whose tasks each borrow a pooled connection.
+
+    Connections are acquired per task, not per worker thread, so that a
+    concurrency above the pool's max_conns merely queues tasks.
+    """
+
+    def __init__(self, client: "SMBClient", concurrency: int) -> None:
+        self.client = client
+        self.pool = client._get_pool()
+        self.executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+
+    def __enter__(self) -> "_WorkerPool":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def _run(
+        self,
+        fn: typing.Callable[[SMBConnection, typing.Any], typing.Any],
+        item: typing.Any,
+    ) -> typing.Any:
+        with self.pool.connection(
+            self.client.server,
+            self.client.share,
+            self.client.username,
+            self.client.password,
+        ) as conn:
+            return fn(conn, item)
+
+    def map(
+        self,
+        fn: typing.Callable[[SMBConnection, typing.Any], typing.Any],
+        items: typing.Iterable[typing.Any],
+    ) -> typing.List[typing.Any]:
+        """Run fn(conn, item) for all items and wait for their results"""
+        return list(self.executor.map(lambda item: self._run(fn, item), items))
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+@dataclasses.dataclass
+class SessionSetupTimes:
+    """Latencies, in seconds, of the phases of establishing an SMB session"""
+
+    transport: float = 0.0
+    negotiate: float = 0.0
+    session_setup: float = 0.0
+    tree_connect: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return (
+            self.transport
+            + self.negotiate
+            + self.session_setup
+            + self.tree_connect
+        )
+
+
+class _TimedSMBConnection(SMBConnection):
+    """SMBConnection which time-stamps protocol phases while connecting"""
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stamps: typing.Dict[str, float] = {}
+
+    def _stamp_tree_connect(self, message: typing.Any) -> None:
+        if message.command not in (
+            SMB_COM_TREE_CONNECT_ANDX,
+            SMB2_COM_TREE_CONNECT,
+        ):
+            return
+        if message.isReply:
+            self.stamps.setdefault("tree_connected", time.monotonic())
+        else:
+            self.stamps.setdefault("tree_connect", time.monotonic())
+
+    def onNMBSessionOK(self) -> None:
+        self.stamps["transport"] = time.monotonic()
+        super().onNMBSessionOK()
+
+    def _updateServerInfo_SMB1(self, payload: typing.Any) -> None:
+        self.stamps["negotiate"] = time.monotonic()
+        super()._updateServerInfo_SMB1(payload)
+
+    def _updateServerInfo_SMB2(self, payload: typing.Any) -> None:
+        self.stamps["negotiate"] = time.monotonic()
+        super()._updateServerInfo_SMB2(payload)
+
+    def _sendSMBMessage_SMB1(self, message: typing.Any) -> None:
+        self._stamp_tree_connect(message)
+        super()._sendSMBMessage_SMB1(message)
+
+    def _sendSMBMessage_SMB2(self, message: typing.Any) -> None:
+        self._stamp_tree_connect(message)
+        super()._sendSMBMessage_SMB2(message)
+
+    def _updateState_SMB1(self, message: typing.Any) -> None:
+        self._stamp_tree_connect(message)
+        super()._updateState_SMB1(message)
+
+    def _updateState_SMB2(self, message: typing.Any) -> None:
+        self._stamp_tree_connect(message)
+        super()._updateState_SMB2(message)
+
+
+def timed_connect(
+    hostname: str, share: str, username: str, passwd: str
+) -> typing.Tuple[SMBConnection, SessionSetupTimes]:
+    """Connect to a share and measure the latency of each setup phase.
+
+    Transport is the time to establish the TCP (and NetBIOS) session,
+    negotiate the time until the negotiate response is received and
+    session_setup the time of authentication. pysmb connects trees
+    implicitly on first access, so the share's root is stat-ed once and
+    tree_connect is the time from sending the tree-connect request until
+    its response is received.
+
+    Parameters:
+    hostname: server to connect to
+    share: share to connect to
+    username: username
+    passwd: password for the user
+
+    Returns:
+    tuple: the authenticated connection and its setup times.
+    """
+    ctx = _TimedSMBConnection(
+        username, passwd, "smbclient", hostname, use_ntlm_v2=True
+    )
+    start = time.monotonic()
+    try:
+        authenticated = ctx.connect(hostname)
+    except base.SMBTimeout as error:
+        raise IOError(f"failed to connect: {error}")
+    authenticated_at = time.monotonic()
+    if not authenticated:
+        ctx.close()
+        raise IOError(f"failed to authenticate: {username}@{hostname}")
+    transport_at = ctx.stamps.get("transport", start)
+    negotiate_at = ctx.stamps.get("negotiate", transport_at)
+    try:
+        ctx.getAttributes(share, "/")
+    except smb_structs.OperationFailure as error:
+        ctx.close()
+        raise IOError(f"failed to connect tree: {error}")
+    if "tree_connected" not in ctx.stamps:
+        ctx.close()
+        raise IOError(f"no tree-connect response: {hostname}/{share}")
+    times = SessionSetupTimes(
+        transport=transport_at - start,
+        negotiate=negotiate_at - transport_at,
+        session_setup=authenticated_at - negotiate_at,
+        tree_connect=ctx.stamps["tree_connected"] - ctx.stamps["tree_connect"],
+    )
+    return (ctx, times)
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "last_used")
+
+    def __init__(self, conn: SMBConnection) -> None:
+        self.conn = conn
+        self.last_used = time.monotonic()
+
+
+class SMBConnectionPool:
+    """Thread-safe pool of authenticated SMB connections.
+
+    Connections are keyed by (server, share, username) and handed out
+    exclusively: a caller owns a connection between acquire() and
+    release(). Connections idle for longer than echo_after are validated
+    with an SMB echo before being reused, so that back-to-back reuse costs
+    no extra round trip, and are closed once idle for longer than
+    idle_timeout. At most max_conns connections exist per key; acquire()
+    blocks until one is released when the limit is reached.
+    """
+
+    def __init__(
+        self,
+        max_conns: int = 16,
+        idle_timeout: float = 60.0,
+        echo_timeout: float = 5.0,
+        echo_after: float = 1.0,
+    ) -> None:
+        self.max_conns = max_conns
+        self.idle_timeout = idle_timeout
+        self.echo_timeout = echo_timeout
+        self.echo_after = echo_after
+        self._cond = threading.Condition()
+        self._idle: typing.Dict[PoolKey, typing.List[_PoolEntry]] = {}
+        self._count: typing.Dict[PoolKey, int] = {}
+        self._busy: typing.Dict[int, PoolKey] = {}
+        self._closed = False
+
+    def _evict_idle(self) -> typing.List[SMBConnection]:
+        expired = []
+        now = time.monotonic()
+        for key, entries in self._idle.items():
+            keep = []
+            for ent in entries:
+                if now - ent.last_used > self.idle_timeout:
+                    expired.append(ent.conn)
+                    self._count[key] -= 1
+                else:
+                    keep.append(ent)
+            entries[:] = keep
+        return expired
+
+    def _is_alive(self, conn: SMBConnection) -> bool:
+        try:
+            conn.echo(b"ping", timeout=self.echo_timeout)
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _close_all(conns: typing.Iterable[SMBConnection]) -> None:
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def acquire(
+        self, hostname: str, share: str, username: str, passwd: str
+    ) -> SMBConnection:
+        """Get an authenticated connection, reusing an idle one if possible.
+
+        Parameters:
+        hostname: server to connect to
+        share: share the connection is used for
+        username: username
+        passwd: password for the user
+
+        Returns:
+        SMBConnection: connection owned by the caller until release().
+        """
+        key = (hostname, share, username)
+        entry = None
+        with self._cond:
+            assert not self._closed, "Connection pool is closed"
+            expired = self._evict_idle()
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    entry = idle.pop()
+                    break
+                if self._count.get(key, 0) < self.max_conns:
+                    self._count[key] = self._count.get(key, 0) + 1
+                    break
+                self._cond.wait()
+        self._close_all(expired)
+        if (
+            entry is not None
+            and time.monotonic() - entry.last_used > self.echo_after
+            and not self._is_alive(entry.conn)
+        ):
+            self._close_all([entry.conn])
+            entry = None
+        try:
+            conn = (
+                entry.conn
+                if entry is not None
+                else _new_connection(hostname, username, passwd)
+            )
+        except Exception:
+            with self._cond:
+                self._count[key] -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._busy[id(conn)] = key
+        return conn
+
+    def release(self, conn: SMBConnection, discard: bool = False) -> None:
+        """Return a connection obtained by acquire() to the pool.
+
+        Parameters:
+        conn: The connection to return.
+        discard: Close the connection instead of keeping it for reuse.
+        """
+        with self._cond:
+            key = self._busy.pop(id(conn))
+            if discard or self._closed:
+                self._count[key] -= 1
+            else:
+                self._idle.setdefault(key, []).append(_PoolEntry(conn))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_all([conn])
+
+    @contextlib.contextmanager
+    def connection(
+        self, hostname: str, share: str, username: str, passwd: str
+    ) -> typing.Iterator[SMBConnection]:
+        """Context manager over acquire() and release()."""
+        conn = self.acquire(hostname, share, username, passwd)
+        discard = False
+        try:
+            yield conn
+        except (base.SMBTimeout, base.NotConnectedError):
+            # transport is broken; do not hand it out again
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close(self) -> None:
+        """Close all idle connections and disable further use of the pool.
+
+        Connections which are in use are closed upon their release.
+        """
+        with self._cond:
+            self._closed = True
+            conns = [e.conn for ents in self._idle.values() for e in ents]
+            for key, entries in self._idle.items():
+                self._count[key] -= len(entries)
+            self._idle.clear()
+        self._close_all(conns)
 
 
 class SMBClient:
     """Use pysmb to access the SMB server"""
 
-    def __init__(self, hostname: str, share: str, username: str, passwd: str):
+    def __init__(
+        self,
+        hostname: str,
+        share: str,
+        username: str,
+        passwd: str,
+        pool: typing.Optional[SMBConnectionPool] = None,
+    ):
         self.server = hostname
         self.share = share
         self.username = username
         self.password = passwd
+        self.pool = pool
+        self._own_pool: typing.Optional[SMBConnectionPool] = None
+        self._counters_lock = threading.Lock()
+        self.counters: typing.Counter[str] = collections.Counter()
         self.connected = False
         self.connect()
 
+    def __enter__(self) -> "SMBClient":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.disconnect()
+
     def connect(self) -> None:
         if self.connected:
             return
-        try:
-            self.ctx = SMBConnection(
-                self.username,
-                self.password,
-                "smbclient",
-                self.server,
-                use_ntlm_v2=True,
+        if self.pool is not None:
+            self.ctx = self.pool.acquire(
+                self.server, self.share, self.username, self.password
+            )
+        else:
+            self.ctx = _new_connection(
+                self.server, self.username, self.password
             )
-            self.ctx.connect(self.server)
-            self.connected = True
-        except base.SMBTimeout as error:
-            raise IOError(f"failed to connect: {error}")
+        self.connected = True
 
     def disconnect(self) -> None:
+        if not self.connected:
+            return
         self.connected = False
-        self.ctx.close()
+        if self.pool is not None:
+            self.pool.release(self.ctx)
+        else:
+            self.ctx.close()
+        if self._own_pool is not None:
+            self._own_pool.close()
+            self._own_pool = None
+
+    def _get_pool(self) -> SMBConnectionPool:
+        if self.pool is not None:
+            return self.pool
+        if self._own_pool is None:
+            self._own_pool = SMBConnectionPool()
+        return self._own_pool
 
     def listdir(self, path: str = "/") -> typing.List[str]:
         try:
@@ -60,6 +510,13 @@ class SMBClient:
         except smb_structs.OperationFailure as error:
             raise IOError(f"failed to unlink: {error}")
 
+    def stat_size(self, fpath: str) -> int:
+        try:
+            attrs = self.ctx.getAttributes(self.share, fpath)
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed to stat: {error}")
+        return attrs.file_size
+
     def write_text(self, fpath: str, teststr: str) -> None:
         try:
             with io.BytesIO(teststr.encode()) as writeobj:
@@ -75,3 +532,366 @@ class SMBClient:
         except smb_structs.OperationFailure as error:
             raise IOError(f"failed in read_text: {error}")
         return ret
+
+    def write_file(
+        self,
+        fpath: str,
+        source: typing.Any,
+        chunk_size: int = 2**20,
+        offset: int = 0,
+        truncate: bool = True,
+    ) -> TransferStats:
+        """Stream data from a file-like source into a remote file.
+
+        Data is pulled from source in chunks of at most chunk_size bytes
+        (further capped by the server's max write size) until end of file,
+        without buffering the whole content.
+
+        Parameters:
+        fpath: remote file path
+        source: object with a read(size) method, e.g. PatternReader
+        chunk_size: maximal size of each read from source
+        offset: offset within the remote file to start writing at
+        truncate: truncate the remote file before writing
+
+        Returns:
+        TransferStats: bytes written and elapsed time.
+        """
+        reader = _ChunkReader(source, chunk_size)
+        start = time.monotonic()
+        try:
+            self.ctx.storeFileFromOffset(
+                self.share, fpath, reader, offset=offset, truncate=truncate
+            )
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed in write_file: {error}")
+        return TransferStats(reader.nbytes, time.monotonic() - start)
+
+    def read_file(
+        self,
+        fpath: str,
+        sink: typing.Any,
+        offset: int = 0,
+        length: int = -1,
+    ) -> TransferStats:
+        """Stream a range of a remote file into a file-like sink.
+
+        Parameters:
+        fpath: remote file path
+        sink: object with a write(data) method, e.g. PatternVerifier
+        offset: offset within the remote file to start reading from
+        length: number of bytes to read, or -1 to read until end of file
+
+        Returns:
+        TransferStats: bytes read and elapsed time.
+        """
+        writer = _CountingWriter(sink)
+        start = time.monotonic()
+        try:
+            self.ctx.retrieveFileFromOffset(
+                self.share, fpath, writer, offset=offset, max_length=length
+            )
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed in read_file: {error}")
+        return TransferStats(writer.nbytes, time.monotonic() - start)
+
+    def verify_file(
+        self,
+        fpath: str,
+        pattern: DataPattern,
+        offset: int = 0,
+        length: int = -1,
+    ) -> TransferStats:
+        """Read a range of a remote file and verify it against a pattern.
+
+        Parameters:
+        fpath: remote file path
+        pattern: data-pattern the file was written with from offset 0
+        offset: offset within the remote file to start reading from
+        length: expected number of bytes, or -1 to read until end of file
+
+        Returns:
+        TransferStats: bytes read and elapsed time.
+        """
+        verifier = PatternVerifier(pattern, offset)
+        stats = self.read_file(fpath, verifier, offset, length)
+        if verifier.mismatch >= 0:
+            raise IOError(f"data mismatch at {fpath}:{verifier.mismatch}")
+        if length >= 0 and stats.nbytes != length:
+            raise IOError(f"short read: {stats.nbytes} != {length} {fpath}")
+        return stats
+
+    def _run_striped(
+        self,
+        fn: typing.Callable[[SMBConnection, int, int], None],
+        size: int,
+        nconns: int,
+        servers: typing.Optional[typing.List[str]],
+        align: int,
+    ) -> StripedTransferStats:
+        pool = self._get_pool()
+        servers = servers or [self.server]
+        ranges = _split_ranges(size, nconns, align)
+
+        def _transfer(idx: int) -> typing.Tuple[str, TransferStats]:
+            offset, length = ranges[idx]
+            server = servers[idx % len(servers)]
+            with pool.connection(
+                server, self.share, self.username, self.password
+            ) as conn:
+                start = time.monotonic()
+                fn(conn, offset, length)
+                return (
+                    server,
+                    TransferStats(length, time.monotonic() - start),
+                )
+
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(nconns) as executor:
+            per_conn = list(executor.map(_transfer, range(len(ranges))))
+        total = TransferStats(size, time.monotonic() - start)
+        return StripedTransferStats(total, per_conn)
+
+    def write_file_striped(
+        self,
+        fpath: str,
+        pattern: DataPattern,
+        size: int,
+        nconns: int = 4,
+        servers: typing.Optional[typing.List[str]] = None,
+        align: int = 2**20,
+    ) -> StripedTransferStats:
+        """Write a pattern file concurrently over multiple connections.
+
+        The file is split into nconns contiguous ranges, each written by
+        its own pooled connection. Connections are spread in round-robin
+        over servers, which may be different public interfaces of the same
+        cluster.
+
+        Parameters:
+        fpath: remote file path
+        pattern: data-pattern to write from offset 0
+        size: size of the file
+        nconns: number of concurrent connections
+        servers: servers to connect to, defaults to this client's server
+        align: alignment of range boundaries
+
+        Returns:
+        StripedTransferStats: aggregate and per-connection statistics.
+        """
+
+        def _write(conn: SMBConnection, offset: int, length: int) -> None:
+            reader = PatternReader(pattern, offset, length)
+            try:
+                conn.storeFileFromOffset(
+                    self.share, fpath, reader, offset=offset
+                )
+            except smb_structs.OperationFailure as error:
+                raise IOError(f"failed in write_file_striped: {error}")
+
+        self.write_file(fpath, PatternReader(pattern, 0, 0))
+        return self._run_striped(_write, size, nconns, servers, align)
+
+    def verify_file_striped(
+        self,
+        fpath: str,
+        pattern: DataPattern,
+        size: int,
+        nconns: int = 4,
+        servers: typing.Optional[typing.List[str]] = None,
+        align: int = 2**20,
+    ) -> StripedTransferStats:
+        """Read and verify a pattern file concurrently over connections.
+
+        Counterpart of write_file_striped().
+
+        Parameters:
+        fpath: remote file path
+        pattern: data-pattern the file was written with from offset 0
+        size: size of the file
+        nconns: number of concurrent connections
+        servers: servers to connect to, defaults to this client's server
+        align: alignment of range boundaries
+
+        Returns:
+        StripedTransferStats: aggregate and per-connection statistics.
+        """
+
+        def _verify(conn: SMBConnection, offset: int, length: int) -> None:
+            verifier = PatternVerifier(pattern, offset)
+            try:
+                conn.retrieveFileFromOffset(
+                    self.share, fpath, verifier, offset, length
+                )
+            except smb_structs.OperationFailure as error:
+                raise IOError(f"failed in verify_file_striped: {error}")
+            if verifier.mismatch >= 0:
+                raise IOError(f"data mismatch at {fpath}:{verifier.mismatch}")
+            if verifier.pos != length:
+                raise IOError(f"short read: {verifier.pos} != {length}")
+
+        return self._run_striped(_verify, size, nconns, servers, align)
+
+    def _count(self, op: str, n: int = 1) -> None:
+        with self._counters_lock:
+            self.counters[op] += n
+
+    def _listdir_split(
+        self, conn: SMBConnection, dpath: str
+    ) -> typing.Tuple[typing.List[str], typing.List[str]]:
+        try:
+            dentries = conn.listPath(self.share, dpath)
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed to readdir: {error}")
+        self._count("listdir")
+        dirs = []
+        files = []
+        for dent in dentries:
+            if dent.filename in (".", ".."):
+                continue
+            if dent.isDirectory:
+                dirs.append(dent.filename)
+            else:
+                files.append(dent.filename)
+        return (dirs, files)
+
+    def walk(
+        self, top: str = "/", concurrency: int = 8
+    ) -> typing.Iterator[
+        typing.Tuple[str, typing.List[str], typing.List[str]]
+    ]:
+        """Walk a remote directory tree, similar to os.walk().
+
+        Directories are listed level by level, with all directories of a
+        level listed concurrently. Parents are always yielded before their
+        children, but the order of siblings is undefined.
+
+        Parameters:
+        top: remote directory to start from
+        concurrency: number of concurrent connections
+
+        Returns:
+        iterator of (dirpath, dirnames, filenames) tuples.
+        """
+        with _WorkerPool(self, concurrency) as workers:
+            level = [top]
+            while level:
+                listings = workers.map(self._listdir_split, level)
+                next_level = []
+                for dpath, (dirs, files) in zip(level, listings):
+                    yield (dpath, dirs, files)
+                    next_level += [posixpath.join(dpath, d) for d in dirs]
+                level = next_level
+
+    def _mkdir_conn(self, conn: SMBConnection, dpath: str) -> None:
+        try:
+            conn.createDirectory(self.share, dpath)
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed to mkdir: {error}")
+        self._count("mkdir")
+
+    def _rmdir_conn(self, conn: SMBConnection, dpath: str) -> None:
+        try:
+            conn.deleteDirectory(self.share, dpath)
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed to rmdir: {error}")
+        self._count("rmdir")
+
+    def _unlink_conn(self, conn: SMBConnection, fpath: str) -> None:
+        try:
+            conn.deleteFiles(self.share, fpath)
+        except smb_structs.OperationFailure as error:
+            raise IOError(f"failed to unlink: {error}")
+        self._count("unlink")
+
+    def upload_tree(
+        self, local_dir: Path, remote_dir: str, concurrency: int = 8
+    ) -> None:
+        """Copy a local directory tree into a new remote directory.
+
+        Parameters:
+        local_dir: local directory to copy
+        remote_dir: remote directory to create
+        concurrency: number of concurrent connections
+        """
+        levels: typing.Dict[int, typing.List[str]] = {}
+        files: typing.List[typing.Tuple[Path, str]] = []
+        for dirpath, _, filenames in os.walk(local_dir):
+            rel = Path(dirpath).relative_to(local_dir)
+            rdir = posixpath.join(remote_dir, rel.as_posix())
+            rdir = posixpath.normpath(rdir)
+            levels.setdefault(len(rel.parts), []).append(rdir)
+            for fname in filenames:
+                local = Path(dirpath) / fname
+                files.append((local, posixpath.join(rdir, fname)))
+
+        def _store(conn: SMBConnection, item: typing.Any) -> None:
+            local, rpath = item
+            with open(local, "rb") as f:
+                try:
+                    conn.storeFile(self.share, rpath, f)
+                except smb_structs.OperationFailure as error:
+                    raise IOError(f"failed to upload {local}: {error}")
+            self._count("store")
+
+        with _WorkerPool(self, concurrency) as workers:
+            for depth in sorted(levels):
+                workers.map(self._mkdir_conn, levels[depth])
+            workers.map(_store, files)
+
+    def download_tree(
+        self, remote_dir: str, local_dir: Path, concurrency: int = 8
+    ) -> None:
+        """Copy a remote directory tree into a new local directory.
+
+        Parameters:
+        remote_dir: remote directory to copy
+        local_dir: local directory to create
+        concurrency: number of concurrent connections
+        """
+        files: typing.List[typing.Tuple[str, Path]] = []
+        for dirpath, _, filenames in self.walk(remote_dir, concurrency):
+            rel = posixpath.relpath(dirpath, remote_dir)
+            ldir = local_dir / rel
+            ldir.mkdir(parents=True)
+            for fname in filenames:
+                files.append((posixpath.join(dirpath, fname), ldir / fname))
+
+        def _retrieve(conn: SMBConnection, item: typing.Any) -> None:
+            rpath, local = item
+            with open(local, "wb") as f:
+                try:
+                    conn.retrieveFile(self.share, rpath, f)
+                except smb_structs.OperationFailure as error:
+                    raise IOError(f"failed to download {rpath}: {error}")
+            self._count("retrieve")
+
+        with _WorkerPool(self, concurrency) as workers:
+            workers.map(_retrieve, files)
+
+    def rmtree(self, remote_dir: str, concurrency: int = 8) -> None:
+        """Remove a remote directory tree.
+
+        All files are removed concurrently first, then directories are
+        removed level by level, deepest first.
+
+        Parameters:
+        remote_dir: remote directory to remove
+        concurrency: number of concurrent connections
+        """
+        levels: typing.List[typing.List[str]] = []
+        files: typing.List[str] = []
+        depth = {remote_dir: 0}
+        for dirpath, dirnames, filenames in self.walk(remote_dir, concurrency):
+            dlevel = depth.pop(dirpath)
+            if len(levels) <= dlevel:
+                levels.append([])
+            levels[dlevel].append(dirpath)
+            for dname in dirnames:
+                depth[posixpath.join(dirpath, dname)] = dlevel + 1
+            files += [posixpath.join(dirpath, f) for f in filenames]
+
+        with _WorkerPool(self, concurrency) as workers:
+            workers.map(self._unlink_conn, files)
+            for level in reversed(levels):
+                workers.map(self._rmdir_conn, level)
@@ -1,7 +1,194 @@
 import yaml
 import typing
-import random
+import os
+import functools
+import dataclasses
 from pathlib import Path
+from .datahelper import make_data_pattern
+
+
+@dataclasses.dataclass
+class User:
+    """Credentials of a test user"""
+
+    __slots__ = ("username", "password")
+    username: str
+    password: str
+
+
+@dataclasses.dataclass
+class Backend:
+    """Backend filesystem of an exported share"""
+
+    __slots__ = ("name",)
+    name: str
+
+
+@dataclasses.dataclass
+class WorkloadCase:
+    """A set of equally sized files to run I/O tests with"""
+
+    __slots__ = ("file_size", "count", "fanout", "concurrency", "fsync")
+    file_size: int
+    count: int
+    fanout: int
+    concurrency: int
+    fsync: str
+
+
+@dataclasses.dataclass
+class WorkloadProfile:
+    """Named list of workload cases"""
+
+    __slots__ = ("name", "cases")
+    name: str
+    cases: typing.List[WorkloadCase]
+
+
+@dataclasses.dataclass
+class LoadgenConfig:
+    """Open-loop load generator settings: a series of target rates (ops/s),
+    each sustained for step_duration seconds, over a set of nfiles files"""
+
+    __slots__ = (
+        "rates",
+        "step_duration",
+        "nfiles",
+        "file_size",
+        "workers",
+        "read_ratio",
+    )
+    rates: typing.List[float]
+    step_duration: float
+    nfiles: int
+    file_size: int
+    workers: int
+    read_ratio: float
+
+
+@dataclasses.dataclass
+class MetadataConfig:
+    """Metadata workload settings: clients concurrent clients each perform
+    nops operations, drawn from a weighted mix, on files within ndirs
+    shared directories. A given seed makes the run reproducible."""
+
+    __slots__ = ("ops", "clients", "nops", "ndirs", "seed")
+    ops: typing.Dict[str, int]
+    clients: int
+    nops: int
+    ndirs: int
+    seed: typing.Optional[int]
+
+
+@dataclasses.dataclass
+class StressConfig:
+    """Stress test settings: threads stress clients within each of
+    processes worker processes, or within the test process itself when
+    processes is zero"""
+
+    __slots__ = ("processes", "threads")
+    processes: int
+    threads: int
+
+
+@dataclasses.dataclass
+class Share:
+    """A single share to be tested, with defaults already applied"""
+
+    __slots__ = ("name", "server", "backend", "users", "path", "workloads")
+    name: str
+    server: str
+    backend: Backend
+    users: typing.List[User]
+    path: typing.Optional[Path]
+    workloads: typing.Dict[str, WorkloadProfile]
+
+
+@dataclasses.dataclass
+class TestConfig:
+    """Parsed test-info with shares indexed by their common lookup keys"""
+
+    __test__ = False
+    __slots__ = (
+        "info",
+        "shares",
+        "public_interfaces",
+        "shares_by_server",
+        "shares_by_backend",
+        "premounted_shares",
+        "exported_shares",
+        "workload_profile",
+        "loadgen",
+        "metadata",
+        "stress",
+        "multi_mounts",
+        "benchmarks",
+    )
+    info: dict
+    shares: typing.Dict[str, Share]
+    public_interfaces: typing.List[str]
+    shares_by_server: typing.Dict[str, typing.List[Share]]
+    shares_by_backend: typing.Dict[str, typing.List[Share]]
+    premounted_shares: typing.List[Share]
+    exported_shares: typing.List[Share]
+    workload_profile: str
+    loadgen: LoadgenConfig
+    metadata: MetadataConfig
+    stress: StressConfig
+    multi_mounts: typing.List[int]
+    benchmarks: bool
+
+
+# Built-in workload profiles, which may be overridden by test-info. Each
+# case is (file_size, count, fanout, concurrency, fsync).
+_default_workloads: typing.Dict[str, typing.List[tuple]] = {
+    "smoke": [
+        (4096, 1, 1, 1, "none"),
+        (2**24, 1, 1, 1, "none"),
+        (2**20, 10, 1, 1, "none"),
+        (1024, 100, 1, 1, "none"),
+    ],
+    "nightly": [
+        (2**30, 4, 1, 4, "file"),
+        (2**24, 64, 8, 8, "none"),
+        (2**20, 1000, 10, 8, "file"),
+        (4096, 10000, 100, 16, "none"),
+    ],
+}
+
+_fsync_policies = ("none", "file")
+
+_default_loadgen: typing.Dict[str, typing.Any] = {
+    "rates": [50, 100, 200, 400, 800],
+    "step_duration": 5,
+    "nfiles": 64,
+    "file_size": 2**16,
+    "workers": 64,
+    "read_ratio": 0.7,
+}
+
+# Operations of the metadata workload
+METADATA_OPS = ("create", "stat", "readdir", "rename", "setattr", "unlink")
+
+_default_metadata: typing.Dict[str, typing.Any] = {
+    "ops": {
+        "create": 100,
+        "stat": 100,
+        "readdir": 10,
+        "rename": 30,
+        "setattr": 30,
+        "unlink": 60,
+    },
+    "clients": 16,
+    "nops": 500,
+    "ndirs": 4,
+    "seed": None,
+}
+
+_default_stress: typing.Dict[str, typing.Any] = {
+    "processes": 0,
+    "threads": 20,
+}
 
 
 def _get_default_backend(test_info: dict) -> str:
@@ -87,21 +274,21 @@ def gen_mount_params(
     return ret
 
 
-def get_mount_parameters(test_info: dict, share: str) -> typing.Dict[str, str]:
+def get_mount_parameters(
+    test_config: TestConfig, share: str
+) -> typing.Dict[str, str]:
     """Get the default mount_params dict for a given share
 
     Parameters:
-    test_info: Dict containing the parsed yaml file.
+    test_config: Parsed test-info configuration.
     share: The share for which to get the mount_params
     """
-    s = get_share(test_info, share)
-    server = s["server"]
-    users = list(s["users"].keys())
+    s = get_share(test_config, share)
     return gen_mount_params(
-        server,
+        s.server,
         share,
-        users[0],
-        s["users"][users[0]],
+        s.users[0].username,
+        s.users[0].password,
     )
 
 
@@ -109,85 +296,280 @@ def generate_random_bytes(size: int) -> bytes:
     """
     Creates sequence of semi-random bytes.
 
-    A wrapper over standard 'random.randbytes()' which should be used in
-    cases where caller wants to avoid exhausting of host's random pool (which
-    may also yield high CPU usage). Uses an existing random bytes-array to
-    re-construct a new one, double in size, plus up-to 1K of newly random
-    bytes. This method creats only "pseudo" (or "semi") random bytes instead
-    of true random bytes-sequence, which should be good enough for I/O
-    integrity testings.
+    A wrapper over 'DataPattern' which should be used in cases where caller
+    wants to avoid exhausting of host's random pool (which may also yield
+    high CPU usage). Returns the head of a pattern stream seeded from the
+    standard 'random' module, which is "pseudo" (or "semi") random instead
+    of true random bytes-sequence and good enough for I/O integrity
+    testings. Callers which deal with large buffers should prefer using
+    'DataPattern' directly and generate data in chunks.
+    """
+    return make_data_pattern().read(0, size)
+
+
+def _parse_size(size: typing.Union[int, str]) -> int:
+    if isinstance(size, int):
+        return size
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in units:
+        return int(size[:-1]) * units[size[-1]]
+    return int(size)
+
+
+def _make_workload_case(case_info: dict) -> WorkloadCase:
+    case = WorkloadCase(
+        file_size=_parse_size(case_info["file_size"]),
+        count=int(case_info.get("count", 1)),
+        fanout=int(case_info.get("fanout", 1)),
+        concurrency=int(case_info.get("concurrency", 1)),
+        fsync=str(case_info.get("fsync", "none")),
+    )
+    assert case.file_size >= 0 and case.count > 0, "Invalid workload case"
+    assert case.fanout > 0 and case.concurrency > 0, "Invalid workload case"
+    assert case.fsync in _fsync_policies, f"Invalid fsync: {case.fsync}"
+    return case
+
+
+def _make_workloads(
+    *workloads_infos: typing.Optional[dict],
+) -> typing.Dict[str, WorkloadProfile]:
+    workloads = {
+        name: WorkloadProfile(name, [WorkloadCase(*c) for c in cases])
+        for name, cases in _default_workloads.items()
+    }
+    for workloads_info in workloads_infos:
+        for name, cases in (workloads_info or {}).items():
+            workloads[name] = WorkloadProfile(
+                name, [_make_workload_case(c) for c in cases]
+            )
+    return workloads
+
+
+def _make_loadgen(loadgen_info: typing.Optional[dict]) -> LoadgenConfig:
+    info = dict(_default_loadgen, **(loadgen_info or {}))
+    rates = info["rates"]
+    if not isinstance(rates, list):
+        # a single rate is sustained for the whole duration
+        rates = [rates]
+    loadgen = LoadgenConfig(
+        rates=[float(r) for r in rates],
+        step_duration=float(info["step_duration"]),
+        nfiles=int(info["nfiles"]),
+        file_size=_parse_size(info["file_size"]),
+        workers=int(info["workers"]),
+        read_ratio=float(info["read_ratio"]),
+    )
+    assert loadgen.rates and min(loadgen.rates) > 0, "Invalid loadgen rates"
+    assert loadgen.step_duration > 0, "Invalid loadgen step_duration"
+    assert loadgen.nfiles > 0 and loadgen.workers > 0, "Invalid loadgen"
+    assert 0 <= loadgen.read_ratio <= 1, "Invalid loadgen read_ratio"
+    return loadgen
+
+
+def _make_metadata(metadata_info: typing.Optional[dict]) -> MetadataConfig:
+    info = dict(_default_metadata, **(metadata_info or {}))
+    seed = info["seed"]
+    metadata = MetadataConfig(
+        ops={op: int(weight) for op, weight in info["ops"].items()},
+        clients=int(info["clients"]),
+        nops=int(info["nops"]),
+        ndirs=int(info["ndirs"]),
+        seed=int(seed) if seed is not None else None,
+    )
+    for op, weight in metadata.ops.items():
+        assert op in METADATA_OPS, f"Invalid metadata op: {op}"
+        assert weight >= 0, f"Invalid weight of metadata op: {op}"
+    assert sum(metadata.ops.values()) > 0, "Invalid metadata ops"
+    assert metadata.clients > 0 and metadata.ndirs > 0, "Invalid metadata"
+    return metadata
+
+
+def _make_stress(stress_info: typing.Optional[dict]) -> StressConfig:
+    info = dict(_default_stress, **(stress_info or {}))
+    stress = StressConfig(
+        processes=int(info["processes"]), threads=int(info["threads"])
+    )
+    assert stress.processes >= 0, "Invalid stress processes"
+    assert stress.threads > 0, "Invalid stress threads"
+    return stress
+
+
+def _make_share(sharename: str, share_info: dict, test_info: dict) -> Share:
+    users = [User(u, p) for u, p in share_info["users"].items()]
+    assert users, f"No users for share {sharename}"
+    path = share_info.get("path")
+    backend = share_info["backend"]["name"]
+    backend_info = (test_info.get("backends") or {}).get(backend) or {}
+    return Share(
+        name=share_info["name"],
+        server=share_info["server"],
+        backend=Backend(backend),
+        users=users,
+        path=Path(path) if path is not None else None,
+        workloads=_make_workloads(
+            test_info.get("workloads"),
+            backend_info.get("workloads"),
+            share_info.get("workloads"),
+        ),
+    )
+
+
+def make_test_config(test_info: dict) -> TestConfig:
+    """Build typed and indexed configuration from parsed test-info.
+
+    Parameters:
+    test_info: Dict as returned by read_yaml().
+
+    Returns:
+    TestConfig: The test configuration object.
+    """
+    shares = {
+        sharename: _make_share(sharename, share_info, test_info)
+        for sharename, share_info in test_info["shares"].items()
+    }
+    shares_by_server: typing.Dict[str, typing.List[Share]] = {}
+    shares_by_backend: typing.Dict[str, typing.List[Share]] = {}
+    for share in shares.values():
+        shares_by_server.setdefault(share.server, []).append(share)
+        shares_by_backend.setdefault(share.backend.name, []).append(share)
+    return TestConfig(
+        info=test_info,
+        shares=shares,
+        public_interfaces=list(test_info.get("public_interfaces", [])),
+        shares_by_server=shares_by_server,
+        shares_by_backend=shares_by_backend,
+        premounted_shares=[s for s in shares.values() if s.path is not None],
+        exported_shares=[s for s in shares.values() if s.path is None],
+        workload_profile=test_info.get("workload_profile", "smoke"),
+        loadgen=_make_loadgen(test_info.get("loadgen")),
+        metadata=_make_metadata(test_info.get("metadata")),
+        stress=_make_stress(test_info.get("stress")),
+        multi_mounts=[int(n) for n in test_info.get("multi_mounts", [])],
+        benchmarks=bool(test_info.get("benchmarks", False)),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_test_config(test_info_file: str) -> TestConfig:
+    """Read test-info yaml file into a test configuration object.
+
+    The file is parsed only once per process; subsequent calls with the
+    same file name return the very same object.
+
+    Parameters:
+    test_info_file: filename of yaml file.
+
+    Returns:
+    TestConfig: The test configuration object.
+    """
+    return make_test_config(read_yaml(test_info_file))
+
+
+def get_test_config() -> TestConfig:
+    """Get the session-wide test configuration.
+
+    Returns:
+    TestConfig: Configuration loaded from the file named by the
+    TEST_INFO_FILE environment variable.
     """
-    rba = bytearray(random.randbytes(min(size, 1024)))
-    while len(rba) < size:
-        rem = size - len(rba)
-        rnd = bytearray(random.randbytes(min(rem, 1024)))
-        rba = rba + rnd + rba
-    return rba[:size]
+    test_info_file = os.getenv("TEST_INFO_FILE")
+    assert test_info_file, "TEST_INFO_FILE is not set"
+    return load_test_config(test_info_file)
 
 
-def get_shares(test_info: dict) -> dict:
+def get_shares(test_config: TestConfig) -> typing.Dict[str, Share]:
     """
     Get list of shares
 
     Parameters:
-    test_info: Dict containing the parsed yaml file.
+    test_config: Parsed test-info configuration.
     Returns:
-    list of dict of shares
+    dict of shares by name
     """
-    return test_info["shares"]
+    return test_config.shares
 
 
-def get_share(test_info: dict, sharename: str) -> dict:
+def get_share(test_config: TestConfig, sharename: str) -> Share:
     """
-    Get share dict for a given sharename
+    Get share for a given sharename
 
     Parameters:
-    test_info: Dict containing the parsed yaml file.
+    test_config: Parsed test-info configuration.
     sharename: name of the share
     Returns:
-    dict of the share
+    the share
     """
-    shares = get_shares(test_info)
+    shares = get_shares(test_config)
     assert sharename in shares.keys(), "Share not found"
     return shares[sharename]
 
 
-def is_premounted_share(share: dict) -> bool:
+def is_premounted_share(share: Share) -> bool:
     """
     Check if the share is a premounted share
 
     Parameters:
-    share: dict of the share
+    share: the share
     Returns:
     bool
     """
-    mntdir = share.get("path")
-    return mntdir is not None
+    return share.path is not None
 
 
-def get_premounted_shares(test_info: dict) -> typing.List[Path]:
+def get_premounted_shares(test_config: TestConfig) -> typing.List[Path]:
     """
     Get list of premounted shares
 
     Parameters:
-    None
+    test_config: Parsed test-info configuration.
     Returns:
     list of paths with shares
     """
-    share_values = get_shares(test_info).values()
-    return [Path(s["path"]) for s in share_values if is_premounted_share(s)]
+    return [s.path for s in test_config.premounted_shares if s.path]
 
 
-def get_exported_shares(test_info: dict) -> typing.List[str]:
+def get_exported_shares(test_config: TestConfig) -> typing.List[str]:
     """Get the list of exported shares
 
     Parameters:
-    test_info: Dict containing the parsed yaml file.
+    test_config: Parsed test-info configuration.
     Returns:
     list of exported shares
     """
-    arr = []
-    for share in get_shares(test_info).values():
-        if not is_premounted_share(share):
-            arr.append(share["name"])
-    return arr
+    return [s.name for s in test_config.exported_shares]
+
+
+def get_public_interfaces(
+    test_config: TestConfig, share: Share
+) -> typing.List[str]:
+    """Get the addresses through which a share can be accessed.
+
+    Parameters:
+    test_config: Parsed test-info configuration.
+    share: the share
+    Returns:
+    list of public interfaces, or the share's server if none configured
+    """
+    return list(test_config.public_interfaces) or [share.server]
+
+
+def get_workload_profile(
+    test_config: TestConfig, share: Share
+) -> WorkloadProfile:
+    """Get the active workload profile of a share.
+
+    Profiles are looked up by the name set with 'workload_profile' in
+    test-info ("smoke" by default). Profiles defined for the share take
+    precedence over those of its backend, which take precedence over
+    global and built-in ones.
+
+    Parameters:
+    test_config: Parsed test-info configuration.
+    share: the share
+    Returns:
+    the workload profile
+    """
+    name = test_config.workload_profile
+    assert name in share.workloads, f"Unknown workload profile: {name}"
+    return share.workloads[name]